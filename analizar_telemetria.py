@@ -0,0 +1,252 @@
+"""Agrega los archivos de telemetría de Stunt Bike Extreme.
+
+Lee los JSONL comprimidos que genera el juego línea a línea, sin cargar los
+archivos en memoria, y muestra un resumen de las partidas:
+
+    python analizar_telemetria.py
+    python analizar_telemetria.py data/telemetria/ --desde 2025-11-01 --json
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from collections import deque
+from datetime import datetime
+
+RUTA_TELEMETRIA = "data/telemetria/"
+TAMANO_CUBETA = 30  # Grados por cubeta del histograma de ángulos
+VENTANA_REBOBINADO = 10 * 60  # Frames que se pueden rebobinar (REBOBINADO_SEGUNDOS * 60 en main.py)
+
+
+class Agregador:
+    """Acumula estadísticas evento a evento, descontando lo rebobinado"""
+
+    def __init__(self):
+        self.eventos = 0
+        self.rebobinados = 0
+        self.descontados = 0
+        # sesion -> [partida, frame máximo, eventos que aún se pueden rebobinar]
+        self._abiertas = {}
+        self.partidas = 0
+        self.saltos = 0
+        self.acrobacias = {}
+        self.aterrizajes_ok = 0
+        self.aterrizajes_fallidos = 0
+        self.rotacion_total = 0
+        self.rotacion_max = 0
+        self.angulos = [0] * (360 // TAMANO_CUBETA)
+        self.combos = 0
+        self.suma_multiplicador = 0.0
+        self.multiplicador_max = 1.0
+        self.vidas_perdidas = 0
+        self.partidas_terminadas = 0
+        self.suma_puntos = 0
+        self.puntos_max = 0
+
+    def agregar(self, evento):
+        self.eventos += 1
+        tipo = evento.get("tipo")
+        sesion = evento.get("sesion")
+
+        if tipo == "inicio_partida":
+            self._cerrar(sesion)
+            reanuda = evento.get("reanuda")
+            if reanuda:
+                # Continúa una partida interrumpida: lo jugado después de su
+                # última instantánea se repite ahora, y no cuenta como partida nueva
+                sesion_anterior, partida_anterior, desde = reanuda
+                self._descontar(sesion_anterior, partida_anterior, desde)
+                self._cerrar(sesion_anterior)
+            else:
+                self._contar(evento)
+            self._abiertas[sesion] = [evento.get("partida"), 0, deque()]
+            return
+
+        abierta = self._abiertas.get(sesion)
+        frame = evento.get("frame")
+        if abierta is None or abierta[0] != evento.get("partida") or frame is None:
+            # Archivos antiguos sin frame o partidas cuyo inicio quedó fuera del filtro
+            if tipo == "rebobinado":
+                self.rebobinados += 1
+            else:
+                self._contar(evento)
+            return
+
+        if tipo == "rebobinado":
+            self.rebobinados += 1
+            self._descontar(sesion, abierta[0], evento.get("hasta") or 0)
+            return
+
+        pendientes = abierta[2]
+        pendientes.append(evento)
+        abierta[1] = max(abierta[1], frame)
+        # Lo que queda más atrás que la ventana de rebobinado ya no puede descontarse
+        while pendientes and pendientes[0]["frame"] < abierta[1] - VENTANA_REBOBINADO:
+            self._contar(pendientes.popleft())
+        if tipo == "fin_partida":
+            self._cerrar(sesion)
+
+    def _descontar(self, sesion, partida, desde):
+        abierta = self._abiertas.get(sesion)
+        if abierta is None or abierta[0] != partida:
+            return
+        pendientes = abierta[2]
+        while pendientes and pendientes[-1]["frame"] >= desde:
+            pendientes.pop()
+            self.descontados += 1
+
+    def _cerrar(self, sesion):
+        abierta = self._abiertas.pop(sesion, None)
+        if abierta is not None:
+            for evento in abierta[2]:
+                self._contar(evento)
+
+    def _confirmar_pendientes(self):
+        """Cuenta lo pendiente de las partidas que no llegaron a terminar"""
+        for sesion in list(self._abiertas):
+            self._cerrar(sesion)
+
+    def _contar(self, evento):
+        tipo = evento.get("tipo")
+
+        if tipo == "inicio_partida":
+            self.partidas += 1
+        elif tipo == "salto":
+            self.saltos += 1
+        elif tipo == "acrobacia":
+            nombre = evento.get("nombre", "?")
+            self.acrobacias[nombre] = self.acrobacias.get(nombre, 0) + 1
+        elif tipo == "aterrizaje":
+            rotacion = abs(evento.get("rotacion") or 0)
+            self.rotacion_total += rotacion
+            self.rotacion_max = max(self.rotacion_max, rotacion)
+            angulo = (evento.get("angulo") or 0) % 360
+            self.angulos[int(angulo) // TAMANO_CUBETA] += 1
+            if evento.get("correcto"):
+                self.aterrizajes_ok += 1
+            else:
+                self.aterrizajes_fallidos += 1
+        elif tipo == "combo":
+            multiplicador = evento.get("multiplicador") or 1.0
+            self.combos += 1
+            self.suma_multiplicador += multiplicador
+            self.multiplicador_max = max(self.multiplicador_max, multiplicador)
+        elif tipo == "vida_perdida":
+            self.vidas_perdidas += 1
+        elif tipo == "fin_partida":
+            puntos = evento.get("puntos") or 0
+            self.partidas_terminadas += 1
+            self.suma_puntos += puntos
+            self.puntos_max = max(self.puntos_max, puntos)
+
+    def resumen(self):
+        self._confirmar_pendientes()
+        aterrizajes = self.aterrizajes_ok + self.aterrizajes_fallidos
+        return {
+            "eventos": self.eventos,
+            "rebobinados": self.rebobinados,
+            "eventos_descontados": self.descontados,
+            "partidas": self.partidas,
+            "saltos": self.saltos,
+            "acrobacias": dict(sorted(self.acrobacias.items())),
+            "aterrizajes": aterrizajes,
+            "aterrizajes_ok": self.aterrizajes_ok,
+            "tasa_exito": self.aterrizajes_ok / aterrizajes if aterrizajes else 0.0,
+            "rotacion_total": self.rotacion_total,
+            "rotacion_media": self.rotacion_total / aterrizajes if aterrizajes else 0.0,
+            "rotacion_max": self.rotacion_max,
+            "histograma_angulos": {
+                f"{i * TAMANO_CUBETA}-{(i + 1) * TAMANO_CUBETA}": n
+                for i, n in enumerate(self.angulos)
+            },
+            "multiplicador_medio": self.suma_multiplicador / self.combos if self.combos else 1.0,
+            "multiplicador_max": self.multiplicador_max,
+            "vidas_perdidas": self.vidas_perdidas,
+            "puntos_medios": (
+                self.suma_puntos / self.partidas_terminadas if self.partidas_terminadas else 0.0
+            ),
+            "puntos_max": self.puntos_max,
+        }
+
+
+def listar_archivos(rutas):
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for nombre in sorted(os.listdir(ruta)):
+                if nombre.endswith(".jsonl.gz") or nombre.endswith(".jsonl"):
+                    yield os.path.join(ruta, nombre)
+        else:
+            yield ruta
+
+
+def leer_eventos(archivos, desde=None, hasta=None):
+    """Genera los eventos de todos los archivos, filtrando por fecha"""
+    for ruta in archivos:
+        abrir = gzip.open if ruta.endswith(".gz") else open
+        try:
+            with abrir(ruta, "rt", encoding="utf-8") as archivo:
+                for linea in archivo:
+                    try:
+                        evento = json.loads(linea)
+                    except ValueError:
+                        continue
+                    t = evento.get("t", 0)
+                    if desde is not None and t < desde:
+                        continue
+                    if hasta is not None and t >= hasta:
+                        continue
+                    yield evento
+        except (OSError, EOFError) as e:
+            # Archivo truncado (p. ej. el juego se cerró de golpe): se usa lo leído
+            print(f"Aviso: {ruta}: {e}", file=sys.stderr)
+
+
+def _fecha(texto):
+    return datetime.strptime(texto, "%Y-%m-%d").timestamp()
+
+
+def imprimir(resumen):
+    print(f"Partidas:          {resumen['partidas']}")
+    print(f"Saltos:            {resumen['saltos']}")
+    print(f"Aterrizajes:       {resumen['aterrizajes']} "
+          f"({resumen['tasa_exito']:.1%} correctos)")
+    print(f"Rotación media:    {resumen['rotacion_media']:.1f}° "
+          f"(máx. {resumen['rotacion_max']}°)")
+    print(f"Multiplicador:     x{resumen['multiplicador_medio']:.2f} medio, "
+          f"x{resumen['multiplicador_max']:.2f} máx.")
+    print(f"Vidas perdidas:    {resumen['vidas_perdidas']}")
+    print(f"Rebobinados:       {resumen['rebobinados']} "
+          f"({resumen['eventos_descontados']} eventos descontados)")
+    print(f"Puntos por partida: {resumen['puntos_medios']:.1f} "
+          f"(máx. {resumen['puntos_max']})")
+    print("Acrobacias:")
+    for nombre, cantidad in resumen["acrobacias"].items():
+        print(f"  {nombre:<12} {cantidad}")
+    print("Ángulo de aterrizaje:")
+    for cubeta, cantidad in resumen["histograma_angulos"].items():
+        print(f"  {cubeta:>8}° {cantidad}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agrega la telemetría de Stunt Bike Extreme")
+    parser.add_argument("rutas", nargs="*", default=[RUTA_TELEMETRIA],
+                        help="archivos o directorios de telemetría")
+    parser.add_argument("--desde", type=_fecha, help="fecha inicial AAAA-MM-DD (incluida)")
+    parser.add_argument("--hasta", type=_fecha, help="fecha final AAAA-MM-DD (excluida)")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args(argv)
+
+    agregador = Agregador()
+    for evento in leer_eventos(listar_archivos(args.rutas), args.desde, args.hasta):
+        agregador.agregar(evento)
+
+    resumen = agregador.resumen()
+    if args.json:
+        print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    else:
+        imprimir(resumen)
+
+
+if __name__ == "__main__":
+    main()
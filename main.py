@@ -3,6 +3,25 @@ import sys
 import os
 import random
 import json
+import math
+import wave
+import gzip
+import time
+import atexit
+import threading
+import socket
+import queue
+import uuid
+import zlib
+import struct
+import argparse
+import tracemalloc
+import weakref
+import gc
+import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_right
 from datetime import datetime
 from abc import ABC, abstractmethod
 
@@ -24,21 +43,232 @@ RUTA_IMAGES = "assets/images/"
 RUTA_SOUNDS = "assets/sounds/"
 RUTA_MUSIC = "assets/music/"
 RUTA_DATA = "data/"
+RUTA_CACHE = "cache/"
+RUTA_TELEMETRIA = f"{RUTA_DATA}telemetria/"
+
+# Telemetría
+TELEMETRIA_ACTIVA = True
+
+# Fantasmas y modo torneo
+SEMILLA_TORNEO = 20251111  # Todas las partidas de torneo usan la misma pista
+FANTASMAS_MAX = 50
+
+# Calidad gráfica: el gobernador la ajusta según el tiempo de frame medido
+CALIDAD_ADAPTATIVA = True
+RESOLUCION_PANTALLA = None  # p. ej. (1920, 1080); None = (ANCHO, ALTO) sin escalado
+
+# Ritmo de frames: "reloj" (Clock.tick), "busy" (Clock.tick_busy_loop),
+# "hibrido" (dormir y terminar en espera activa) o "vsync" (flip sincronizado)
+FPS = 60
+RITMO_ESTRATEGIA = "hibrido"
+RITMO_MARGEN_MS = 1.5  # Tramo final de cada espera que se hace activa en vez de dormir
+RITMO_INFORME = 0  # Frames entre informes de jitter en consola; 0 = sin informes
+
+# Instrumentación de memoria (tracemalloc tiene coste; desactivada por defecto)
+MEMORIA_INSTRUMENTADA = False
+
+# Rebobinado (mantener R) y reanudación tras un corte
+REBOBINADO_CADA = 6  # Frames entre instantáneas
+REBOBINADO_SEGUNDOS = 10
+REBOBINADO_PRESUPUESTO = 256 * 1024  # Bytes máximos del buffer de instantáneas
+PERSISTIR_CADA = 300  # Frames entre instantáneas guardadas en disco
+
+# Marcador compartido: None usa solo los archivos locales; p. ej. ("192.168.1.10", 8765)
+SERVIDOR_PUNTAJES = None
+
+# Configuración de audio
+FRECUENCIA_AUDIO = 44100
+BUFFER_AUDIO = 512  # Muestras por bloque; valores bajos reducen la latencia
+CANALES_AUDIO = 8
 
 # ==================== GESTORES DE RECURSOS ====================
+class MotorAudio:
+    """Gestiona el mezclador, un pool fijo de canales con prioridad y la música"""
+    
+    # Los efectos de mayor prioridad pueden interrumpir a los de menor
+    PRIORIDADES = {
+        'exito': 1,
+        'fallo': 2,
+    }
+    
+    def __init__(self, frecuencia=FRECUENCIA_AUDIO, buffer=BUFFER_AUDIO,
+                 canales=CANALES_AUDIO, predecodificar_musica=True):
+        self.frecuencia = frecuencia
+        self.buffer = buffer
+        self.predecodificar_musica = predecodificar_musica
+        self.disponible = False
+        self.canales = []
+        self.sonidos = {'exito': None, 'fallo': None}
+        
+        # Estado de cada canal del pool: prioridad y orden de inicio
+        self._prioridad_canal = []
+        self._inicio_canal = []
+        self._contador = 0
+        
+        self._iniciar_mezclador(canales)
+        if self.disponible:
+            self.sonidos = self._cargar_sonidos()
+    
+    @staticmethod
+    def preconfigurar(frecuencia=FRECUENCIA_AUDIO, buffer=BUFFER_AUDIO):
+        """Debe llamarse antes de pygame.init() para que el mezclador use esta configuración"""
+        pygame.mixer.pre_init(frecuencia, -16, 2, buffer)
+    
+    def _iniciar_mezclador(self, canales):
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(self.frecuencia, -16, 2, self.buffer)
+            pygame.mixer.set_num_channels(canales)
+            self.canales = [pygame.mixer.Channel(i) for i in range(canales)]
+            self._prioridad_canal = [0] * canales
+            self._inicio_canal = [0] * canales
+            self.disponible = True
+        except Exception as e:
+            print(f"Error iniciando el mezclador: {e}")
+    
+    def _cargar_sonidos(self):
+        try:
+            exito = pygame.mixer.Sound(f"{RUTA_SOUNDS}sonido_exito.wav")
+            fallo = pygame.mixer.Sound(f"{RUTA_SOUNDS}sonido_fallo.wav")
+            exito.set_volume(1.0)
+            fallo.set_volume(1.0)
+            return {'exito': exito, 'fallo': fallo}
+        except Exception as e:
+            print(f"Error cargando sonidos: {e}")
+            return {'exito': None, 'fallo': None}
+    
+    def reproducir(self, nombre):
+        """Reproduce un efecto en el pool; devuelve False si se descartó"""
+        sonido = self.sonidos.get(nombre)
+        if sonido is None:
+            return False
+        
+        prioridad = self.PRIORIDADES.get(nombre, 0)
+        indice = self._elegir_canal(prioridad)
+        if indice is None:
+            return False
+        
+        self._contador += 1
+        self._prioridad_canal[indice] = prioridad
+        self._inicio_canal[indice] = self._contador
+        self.canales[indice].play(sonido)
+        return True
+    
+    def _elegir_canal(self, prioridad):
+        # Primero un canal libre; si no hay, el más antiguo de menor prioridad
+        victima = None
+        for i, canal in enumerate(self.canales):
+            if not canal.get_busy():
+                return i
+            if self._prioridad_canal[i] > prioridad:
+                continue
+            if victima is None or (self._prioridad_canal[i], self._inicio_canal[i]) < (
+                self._prioridad_canal[victima], self._inicio_canal[victima]
+            ):
+                victima = i
+        return victima
+    
+    def _ruta_musica_pcm(self, ruta_mp3):
+        estado = os.stat(ruta_mp3)
+        frecuencia, formato, canales = pygame.mixer.get_init()
+        base = os.path.splitext(os.path.basename(ruta_mp3))[0]
+        return (
+            f"{RUTA_CACHE}{base}_{int(estado.st_mtime)}_{estado.st_size}"
+            f"_{frecuencia}_{abs(formato)}_{canales}.wav"
+        )
+    
+    def _predecodificar(self, ruta_mp3):
+        """Decodifica el MP3 una sola vez a PCM en disco y devuelve la ruta del WAV"""
+        ruta_pcm = self._ruta_musica_pcm(ruta_mp3)
+        if os.path.exists(ruta_pcm):
+            return ruta_pcm
+        
+        frecuencia, formato, canales = pygame.mixer.get_init()
+        sonido = pygame.mixer.Sound(ruta_mp3)
+        os.makedirs(RUTA_CACHE, exist_ok=True)
+        ruta_temporal = ruta_pcm + ".tmp"
+        with wave.open(ruta_temporal, "wb") as archivo:
+            archivo.setnchannels(canales)
+            archivo.setsampwidth(abs(formato) // 8)
+            archivo.setframerate(frecuencia)
+            archivo.writeframes(sonido.get_raw())
+        os.replace(ruta_temporal, ruta_pcm)
+        self._borrar_cache_antigua(ruta_mp3, ruta_pcm)
+        return ruta_pcm
+    
+    def _borrar_cache_antigua(self, ruta_mp3, ruta_pcm):
+        """Borra los WAV de versiones anteriores del MP3 o de otro formato del mezclador"""
+        prefijo = os.path.splitext(os.path.basename(ruta_mp3))[0] + "_"
+        for nombre in os.listdir(RUTA_CACHE):
+            ruta = os.path.join(RUTA_CACHE, nombre)
+            if nombre.startswith(prefijo) and nombre.endswith(".wav") and ruta != ruta_pcm:
+                try:
+                    os.remove(ruta)
+                except OSError as e:
+                    print(f"No se pudo borrar {ruta}: {e}")
+    
+    def iniciar_musica(self):
+        if not self.disponible:
+            return
+        ruta = f"{RUTA_MUSIC}musica_fondo.mp3"
+        try:
+            if self.predecodificar_musica:
+                try:
+                    ruta = self._predecodificar(ruta)
+                except Exception as e:
+                    print(f"No se pudo predecodificar la música: {e}")
+            pygame.mixer.music.load(ruta)
+            pygame.mixer.music.set_volume(0.5)
+            pygame.mixer.music.play(-1)
+        except:
+            print("No se pudo cargar la música de fondo")
+
+
+class CapaParallax:
+    """Capa de fondo pre-renderizada que se repite horizontalmente"""
+    
+    def __init__(self, superficie, factor, y=0):
+        self.superficie = superficie
+        self.factor = factor  # 0 = fija, 1 = se mueve con la cámara
+        self.y = y
+        self.ancho = superficie.get_width()
+    
+    def dibujar(self, ventana, offset_x):
+        # Como mucho dos blits: la copia que entra por la izquierda y la siguiente
+        x = -int(offset_x * self.factor) % self.ancho
+        if x > 0:
+            ventana.blit(self.superficie, (x - self.ancho, self.y))
+        if x < ventana.get_width():
+            ventana.blit(self.superficie, (x, self.y))
+
+
+class FondoParallax:
+    """Fondo compuesto por varias capas con distinta velocidad de desplazamiento"""
+    
+    def __init__(self, capas):
+        self.capas = capas
+    
+    def dibujar(self, ventana, offset_x=0, capas=None):
+        """Dibuja las `capas` primeras capas (todas si es None), del fondo hacia delante"""
+        for capa in self.capas[:capas]:
+            capa.dibujar(ventana, offset_x)
+
+
 class GestorRecursos:
     """Gestiona la carga de recursos como fuentes, imágenes y sonidos"""
     
     def __init__(self):
+        MotorAudio.preconfigurar()
         pygame.init()
         self.fuentes = self._cargar_fuentes()
         self.sprites = self._cargar_sprites()
-        self.sonidos = self._cargar_sonidos()
+        self.audio = MotorAudio()
+        self.sonidos = self.audio.sonidos
         self.fondo = self._cargar_fondo()
-
+    
     def _crear_directorios(self):
         """Crea los directorios necesarios si no existen"""
-        for directorio in [RUTA_IMAGES, RUTA_SOUNDS, RUTA_MUSIC, RUTA_DATA]:
+        for directorio in [RUTA_IMAGES, RUTA_SOUNDS, RUTA_MUSIC, RUTA_DATA, RUTA_CACHE]:
             os.makedirs(directorio, exist_ok=True)
     
     def _cargar_fuentes(self):
@@ -83,38 +313,70 @@ class GestorRecursos:
         
         return sprites
     
-    def _cargar_sonidos(self):
-        try:
-            exito = pygame.mixer.Sound(f"{RUTA_SOUNDS}sonido_exito.wav")
-            fallo = pygame.mixer.Sound(f"{RUTA_SOUNDS}sonido_fallo.wav")
-            exito.set_volume(1.0)
-            fallo.set_volume(1.0)
-            return {'exito': exito, 'fallo': fallo}
-        except Exception as e:
-            print(f"Error cargando sonidos: {e}")
-            return {'exito': None, 'fallo': None}
-    
     def _cargar_fondo(self):
+        ancho_capa = ANCHO * 2
+        return FondoParallax([
+            CapaParallax(self._crear_cielo(ancho_capa), 0.1),
+            CapaParallax(
+                self._crear_silueta(ancho_capa, 260, (60, 80, 120, 170), [(2, 70, 0.0), (5, 25, 1.3)]),
+                0.3, ALTO - 260
+            ),
+            CapaParallax(
+                self._crear_silueta(ancho_capa, 160, (40, 110, 60, 200), [(3, 35, 0.7), (7, 15, 2.1)]),
+                0.6, ALTO - 160
+            ),
+        ])
+    
+    def _crear_cielo(self, ancho_capa):
         try:
-            fondo = pygame.image.load(f"{RUTA_IMAGES}fondo.png").convert()
-            return pygame.transform.scale(fondo, (ANCHO, ALTO))
+            imagen = pygame.image.load(f"{RUTA_IMAGES}fondo.png").convert()
+            imagen = pygame.transform.scale(imagen, (ANCHO, ALTO))
         except:
-            # Crear fondo degradado
-            fondo = pygame.Surface((ANCHO, ALTO))
-            for y in range(ALTO):
-                color_r = int(135 * (1 - y / ALTO))
-                color_g = int(206 * (1 - y / ALTO))
-                color_b = int(235 * (1 - y / ALTO))
-                pygame.draw.line(fondo, (color_r, color_g, color_b), (0, y), (ANCHO, y))
-            return fondo
-    
-    def iniciar_musica(self):
+            imagen = self._cargar_degradado()
+        
+        # La imagen seguida de su reflejo se repite sin costuras
+        cielo = pygame.Surface((ancho_capa, ALTO)).convert()
+        cielo.blit(imagen, (0, 0))
+        cielo.blit(pygame.transform.flip(imagen, True, False), (ANCHO, 0))
+        return cielo
+    
+    def _cargar_degradado(self):
+        ruta = f"{RUTA_CACHE}fondo_degradado_{ANCHO}x{ALTO}.png"
         try:
-            pygame.mixer.music.load(f"{RUTA_MUSIC}musica_fondo.mp3")
-            pygame.mixer.music.set_volume(0.5)
-            pygame.mixer.music.play(-1)
+            return pygame.image.load(ruta).convert()
         except:
-            print("No se pudo cargar la música de fondo")
+            pass
+        
+        # Crear fondo degradado una sola vez y guardarlo en caché
+        fondo = pygame.Surface((ANCHO, ALTO))
+        for y in range(ALTO):
+            color_r = int(135 * (1 - y / ALTO))
+            color_g = int(206 * (1 - y / ALTO))
+            color_b = int(235 * (1 - y / ALTO))
+            pygame.draw.line(fondo, (color_r, color_g, color_b), (0, y), (ANCHO, y))
+        try:
+            os.makedirs(RUTA_CACHE, exist_ok=True)
+            pygame.image.save(fondo, ruta)
+        except Exception as e:
+            print(f"No se pudo guardar el fondo en caché: {e}")
+        return fondo.convert()
+    
+    def _crear_silueta(self, ancho_capa, altura, color, ondas):
+        """Dibuja un perfil de colinas periódico en el ancho de la capa"""
+        capa = pygame.Surface((ancho_capa, altura), pygame.SRCALPHA)
+        base = altura * 0.55
+        puntos = [(0, altura)]
+        for x in range(0, ancho_capa + 1, 8):
+            y = base
+            for ciclos, amplitud, fase in ondas:
+                y -= amplitud * math.sin(2 * math.pi * ciclos * x / ancho_capa + fase)
+            puntos.append((x, int(y)))
+        puntos.append((ancho_capa, altura))
+        pygame.draw.polygon(capa, color, puntos)
+        return capa.convert_alpha()
+    
+    def iniciar_musica(self):
+        self.audio.iniciar_musica()
 
 # ==================== GESTORES DE DATOS ====================
 class GestorPuntajes:
@@ -123,9 +385,17 @@ class GestorPuntajes:
     ARCHIVO_RECORD = f"{RUTA_DATA}record.txt"
     ARCHIVO_PUNTAJES = f"{RUTA_DATA}puntajes.json"
     
-    def __init__(self):
+    def __init__(self, servidor=None, solo_lectura=False):
+        self.solo_lectura = solo_lectura
         self.record = self._cargar_record()
         self.puntajes_altos = self._cargar_puntajes()
+        self.repeticiones = GestorRepeticiones()
+        
+        self.cliente = None
+        if servidor is not None:
+            self.cliente = ClienteMarcador(*servidor)
+            self.cliente.start()
+            atexit.register(self.cliente.detener)
     
     def _cargar_record(self):
         try:
@@ -139,6 +409,8 @@ class GestorPuntajes:
     def guardar_record(self, puntos):
         if puntos > self.record:
             self.record = puntos
+            if self.solo_lectura:
+                return True
             try:
                 with open(self.ARCHIVO_RECORD, "w") as file:
                     file.write(str(self.record))
@@ -156,10 +428,21 @@ class GestorPuntajes:
             pass
         return []
     
-    def guardar_puntaje(self, puntos):
+    def guardar_puntaje(self, puntos, repeticion=None):
+        if self.solo_lectura:
+            return
+        fecha = datetime.now().strftime("%d/%m/%Y %H:%M")
+        nuevo_puntaje = {"puntos": puntos, "fecha": fecha}
+        if repeticion is not None:
+            id_repeticion = self.repeticiones.guardar(puntos, fecha, repeticion)
+            if id_repeticion is not None:
+                nuevo_puntaje["repeticion"] = id_repeticion
+        
+        # El envío al servidor solo encola; nunca bloquea el bucle del juego
+        if self.cliente is not None:
+            self.cliente.enviar(nuevo_puntaje)
+        
         try:
-            fecha = datetime.now().strftime("%d/%m/%Y %H:%M")
-            nuevo_puntaje = {"puntos": puntos, "fecha": fecha}
             self.puntajes_altos.append(nuevo_puntaje)
             self.puntajes_altos.sort(key=lambda x: x["puntos"], reverse=True)
             self.puntajes_altos = self.puntajes_altos[:10]
@@ -168,6 +451,428 @@ class GestorPuntajes:
                 json.dump(self.puntajes_altos, file)
         except:
             pass
+    
+    def mejores_puntajes(self):
+        """Devuelve (puntajes, es_compartido): el marcador remoto si está disponible"""
+        if self.cliente is not None:
+            self.cliente.solicitar_top(10)
+            if self.cliente.conectado and self.cliente.top is not None:
+                return self.cliente.top, True
+        return self.puntajes_altos, False
+
+
+class GestorRepeticiones:
+    """Guarda las entradas de las mejores partidas para reproducirlas como fantasmas"""
+    
+    DIRECTORIO = f"{RUTA_DATA}repeticiones/"
+    ARCHIVO_INDICE = f"{RUTA_DATA}repeticiones/indice.json"
+    
+    def __init__(self, maximo=FANTASMAS_MAX):
+        self.maximo = maximo
+        self.indice = self._cargar_indice()
+    
+    def _cargar_indice(self):
+        try:
+            if os.path.exists(self.ARCHIVO_INDICE):
+                with open(self.ARCHIVO_INDICE, "r") as file:
+                    return json.load(file)
+        except:
+            pass
+        return []
+    
+    def guardar(self, puntos, fecha, repeticion):
+        """Guarda la repetición si entra entre las mejores; devuelve su id o None"""
+        try:
+            os.makedirs(self.DIRECTORIO, exist_ok=True)
+            id_repeticion = uuid.uuid4().hex
+            with open(f"{self.DIRECTORIO}{id_repeticion}.json", "w") as file:
+                json.dump(repeticion, file)
+            
+            self.indice.append({
+                "id": id_repeticion, "puntos": puntos, "fecha": fecha,
+                "semilla": repeticion["semilla"]
+            })
+            self.indice.sort(key=lambda x: x["puntos"], reverse=True)
+            
+            # El torneo tiene su propio cupo: las partidas normales, con semilla
+            # aleatoria, no pueden desplazar a sus fantasmas
+            torneo = repeticion["semilla"] == SEMILLA_TORNEO
+            grupo = [e for e in self.indice if (e.get("semilla") == SEMILLA_TORNEO) == torneo]
+            descartadas = grupo[self.maximo:]
+            ids_descartadas = {entrada["id"] for entrada in descartadas}
+            self.indice = [e for e in self.indice if e["id"] not in ids_descartadas]
+            for entrada in descartadas:
+                try:
+                    os.remove(f"{self.DIRECTORIO}{entrada['id']}.json")
+                except OSError:
+                    pass
+            
+            with open(self.ARCHIVO_INDICE, "w") as file:
+                json.dump(self.indice, file)
+            
+            if id_repeticion in ids_descartadas:
+                return None
+            return id_repeticion
+        except Exception as e:
+            print(f"Error guardando repetición: {e}")
+            return None
+    
+    def cargar(self, id_repeticion):
+        try:
+            with open(f"{self.DIRECTORIO}{id_repeticion}.json", "r") as file:
+                return json.load(file)
+        except:
+            return None
+    
+    def mejores(self, semilla, cantidad):
+        """Carga las mejores repeticiones jugadas en la pista de `semilla`"""
+        repeticiones = []
+        for entrada in self.indice:
+            if len(repeticiones) >= cantidad:
+                break
+            if entrada.get("semilla") == semilla:
+                repeticion = self.cargar(entrada["id"])
+                if repeticion is not None:
+                    repeticiones.append(repeticion)
+        return repeticiones
+
+
+class ConexionMarcador:
+    """Conexión TCP persistente con el servidor de puntajes (un JSON por línea)"""
+    
+    def __init__(self, host, puerto, timeout):
+        self.socket = socket.create_connection((host, puerto), timeout=timeout)
+        self.archivo = self.socket.makefile("rwb")
+    
+    def peticion(self, datos):
+        self.archivo.write(json.dumps(datos, ensure_ascii=False).encode() + b"\n")
+        self.archivo.flush()
+        linea = self.archivo.readline()
+        if not linea:
+            raise ConnectionError("El servidor cerró la conexión")
+        return json.loads(linea)
+    
+    def cerrar(self):
+        try:
+            self.archivo.close()
+            self.socket.close()
+        except OSError:
+            pass
+
+
+class PoolConexiones:
+    """Reutiliza conexiones con el servidor en lugar de abrir una por petición"""
+    
+    def __init__(self, host, puerto, tamano=2, timeout=2.0):
+        self.host = host
+        self.puerto = puerto
+        self.tamano = tamano
+        self.timeout = timeout
+        self._libres = []
+        self._lock = threading.Lock()
+    
+    def obtener(self):
+        with self._lock:
+            if self._libres:
+                return self._libres.pop()
+        return ConexionMarcador(self.host, self.puerto, self.timeout)
+    
+    def devolver(self, conexion):
+        with self._lock:
+            if len(self._libres) < self.tamano:
+                self._libres.append(conexion)
+                return
+        conexion.cerrar()
+    
+    def peticion(self, datos):
+        """Envía una petición por una conexión del pool; descarta la conexión si falla"""
+        conexion = self.obtener()
+        try:
+            respuesta = conexion.peticion(datos)
+        except Exception:
+            conexion.cerrar()
+            raise
+        self.devolver(conexion)
+        return respuesta
+    
+    def cerrar(self):
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conexion in libres:
+            conexion.cerrar()
+
+
+class ClienteMarcador(threading.Thread):
+    """Envía puntajes y consulta el marcador compartido desde un hilo propio"""
+    
+    ARCHIVO_PENDIENTES = f"{RUTA_DATA}puntajes_pendientes.json"
+    
+    def __init__(self, host, puerto, lote=20, reintento=5.0, vigencia_top=10.0):
+        super().__init__(name="marcador", daemon=True)
+        self.pool = PoolConexiones(host, puerto)
+        self.lote = lote
+        self.reintento = reintento
+        self.vigencia_top = vigencia_top
+        self.cabina = socket.gethostname()
+        
+        self.conectado = False
+        self.top = None
+        
+        self._cola = queue.Queue()
+        self._pendientes = self._cargar_pendientes()
+        self._k_solicitado = 0
+        self._ultimo_top = -vigencia_top
+        self._ultima_solicitud = -1.0
+        self._ultimo_fallo = 0.0
+        self._detener = threading.Event()
+    
+    def enviar(self, puntaje):
+        puntaje = dict(puntaje, id=uuid.uuid4().hex, cabina=self.cabina)
+        self._cola.put(puntaje)
+    
+    def solicitar_top(self, k=10):
+        # Se llama en cada frame desde EstadoPuntajes; solo despierta al hilo si hace falta
+        ahora = time.monotonic()
+        vencido = ahora - self._ultimo_top >= self.vigencia_top
+        if k > self._k_solicitado or (vencido and ahora - self._ultima_solicitud >= 1.0):
+            self._k_solicitado = max(k, self._k_solicitado)
+            self._ultima_solicitud = ahora
+            self._cola.put(None)
+    
+    def detener(self):
+        self._detener.set()
+        self._cola.put(None)
+        if self.is_alive():
+            self.join(timeout=self.pool.timeout * 2)
+        self._guardar_pendientes()
+        self.pool.cerrar()
+    
+    def run(self):
+        while not self._detener.is_set():
+            try:
+                puntaje = self._cola.get(timeout=self.reintento)
+                if puntaje is not None:
+                    self._pendientes.append(puntaje)
+            except queue.Empty:
+                pass
+            
+            # Agrupar todo lo que ya esté en la cola en un mismo lote
+            while True:
+                try:
+                    puntaje = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if puntaje is not None:
+                    self._pendientes.append(puntaje)
+            
+            if time.monotonic() - self._ultimo_fallo < self.reintento:
+                continue
+            self._sincronizar()
+    
+    def _sincronizar(self):
+        try:
+            enviados = False
+            while self._pendientes:
+                lote = self._pendientes[:self.lote]
+                respuesta = self.pool.peticion({"op": "enviar", "puntajes": lote})
+                if not respuesta.get("ok"):
+                    break
+                del self._pendientes[:len(lote)]
+                enviados = True
+            
+            # Tras un envío el marcador cacheado ya no es válido
+            vencido = time.monotonic() - self._ultimo_top >= self.vigencia_top
+            if self._k_solicitado and (enviados or vencido):
+                respuesta = self.pool.peticion({"op": "top", "k": self._k_solicitado})
+                if respuesta.get("ok"):
+                    self.top = respuesta["puntajes"]
+                    self._ultimo_top = time.monotonic()
+            self.conectado = True
+        except Exception:
+            self.conectado = False
+            self._ultimo_fallo = time.monotonic()
+            self._guardar_pendientes()
+    
+    def _cargar_pendientes(self):
+        try:
+            if os.path.exists(self.ARCHIVO_PENDIENTES):
+                with open(self.ARCHIVO_PENDIENTES, "r") as file:
+                    return json.load(file)
+        except:
+            pass
+        return []
+    
+    def _guardar_pendientes(self):
+        try:
+            if self._pendientes:
+                os.makedirs(os.path.dirname(self.ARCHIVO_PENDIENTES), exist_ok=True)
+                with open(self.ARCHIVO_PENDIENTES, "w") as file:
+                    json.dump(self._pendientes, file)
+            elif os.path.exists(self.ARCHIVO_PENDIENTES):
+                os.remove(self.ARCHIVO_PENDIENTES)
+        except:
+            pass
+
+
+# ==================== TELEMETRÍA ====================
+class BusTelemetria:
+    """Recoge eventos de juego en un buffer circular preasignado"""
+    
+    # Nombre de los valores (a, b, c) de cada tipo de evento
+    CAMPOS = {
+        'inicio_partida': ('reanuda',),
+        'salto': (),
+        'acrobacia': ('nombre', 'puntos'),
+        'aterrizaje': ('rotacion', 'angulo', 'correcto'),
+        'combo': ('multiplicador', 'puntos'),
+        'vida_perdida': ('vidas',),
+        'fin_partida': ('puntos',),
+        'rebobinado': ('hasta',),
+    }
+    
+    def __init__(self, capacidad=4096, activo=TELEMETRIA_ACTIVA):
+        self.capacidad = capacidad
+        self.activo = activo
+        self.sesion = int(time.time())
+        self.partida = 0
+        self.frame = 0
+        self.perdidos = 0
+        
+        self._tiempos = [0.0] * capacidad
+        self._partidas = [0] * capacidad
+        self._frames = [0] * capacidad
+        self._tipos = [None] * capacidad
+        self._a = [None] * capacidad
+        self._b = [None] * capacidad
+        self._c = [None] * capacidad
+        self._escritos = 0
+        self._leidos = 0
+    
+    def nueva_partida(self, reanuda=None):
+        """`reanuda` = [sesion, partida, frame] de la partida interrumpida que continúa"""
+        self.partida += 1
+        self.frame = 0
+        self.emitir('inicio_partida', reanuda)
+    
+    def emitir(self, tipo, a=None, b=None, c=None):
+        if not self.activo:
+            return
+        i = self._escritos % self.capacidad
+        self._tiempos[i] = time.time()
+        self._partidas[i] = self.partida
+        self._frames[i] = self.frame
+        self._tipos[i] = tipo
+        self._a[i] = a
+        self._b[i] = b
+        self._c[i] = c
+        self._escritos += 1
+    
+    def extraer(self):
+        escritos = self._escritos
+        inicio = max(self._leidos, escritos - self.capacidad)
+        self.perdidos += inicio - self._leidos
+        
+        eventos = []
+        for n in range(inicio, escritos):
+            i = n % self.capacidad
+            eventos.append((
+                self._tiempos[i], self._partidas[i], self._frames[i], self._tipos[i],
+                self._a[i], self._b[i], self._c[i]
+            ))
+        self._leidos = escritos
+        return eventos
+
+
+class EscritorTelemetria(threading.Thread):
+    """Vuelca el bus de telemetría a archivos JSONL comprimidos y rotativos"""
+    
+    def __init__(self, bus, directorio=RUTA_TELEMETRIA, intervalo=1.0,
+                 max_bytes=5_000_000, max_archivos=50):
+        super().__init__(name="telemetria", daemon=True)
+        self.bus = bus
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.max_bytes = max_bytes
+        self.max_archivos = max_archivos
+        
+        self._detener = threading.Event()
+        self._archivo = None
+        self._bytes = 0
+        self._dia = None
+        self._secuencia = 0
+    
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            self._volcar()
+        self._volcar()
+        self._cerrar_archivo()
+    
+    def detener(self):
+        self._detener.set()
+        if self.is_alive():
+            self.join(timeout=2)
+    
+    def _volcar(self):
+        eventos = self.bus.extraer()
+        if not eventos:
+            return
+        try:
+            for evento in eventos:
+                archivo = self._archivo_actual()
+                linea = json.dumps(self._serializar(evento), ensure_ascii=False) + "\n"
+                archivo.write(linea)
+                self._bytes += len(linea)
+            archivo.flush()
+        except Exception as e:
+            print(f"Error escribiendo telemetría: {e}")
+    
+    def _serializar(self, evento):
+        tiempo, partida, frame, tipo, *valores = evento
+        datos = {
+            "t": round(tiempo, 3), "sesion": self.bus.sesion, "partida": partida,
+            "frame": frame, "tipo": tipo,
+        }
+        for campo, valor in zip(BusTelemetria.CAMPOS.get(tipo, ()), valores):
+            datos[campo] = valor
+        return datos
+    
+    def _archivo_actual(self):
+        dia = datetime.now().strftime("%Y%m%d")
+        if self._archivo is not None and (self._bytes >= self.max_bytes or dia != self._dia):
+            self._cerrar_archivo()
+        
+        if self._archivo is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._secuencia += 1
+            marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+            ruta = os.path.join(
+                self.directorio, f"telemetria_{marca}_{os.getpid()}_{self._secuencia}.jsonl.gz"
+            )
+            self._archivo = gzip.open(ruta, "wt", encoding="utf-8")
+            self._bytes = 0
+            self._dia = dia
+            self._purgar()
+        return self._archivo
+    
+    def _cerrar_archivo(self):
+        if self._archivo is not None:
+            try:
+                self._archivo.close()
+            except Exception:
+                pass
+            self._archivo = None
+    
+    def _purgar(self):
+        archivos = sorted(
+            (f for f in os.listdir(self.directorio) if f.startswith("telemetria_")),
+            key=lambda f: os.path.getmtime(os.path.join(self.directorio, f))
+        )
+        for nombre in archivos[:-self.max_archivos]:
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except OSError:
+                pass
+
 
 # ==================== ENTIDADES DEL JUEGO ====================
 class Personaje:
@@ -181,6 +886,7 @@ class Personaje:
         self.en_suelo = True
         self.sprites = sprites
         self.acrobacia_actual = None
+        self.acrobacia_tecla = None
         self.acrobacia_timer = 0
         
         # Constantes de física
@@ -199,6 +905,52 @@ class Personaje:
         self.vel_y += self.gravedad
         self.y += self.vel_y
     
+    def avanzar_vuelo(self, frames):
+        """Aplica `frames` pasos de física con las mismas operaciones que actualizar_fisica"""
+        vel_y, y, gravedad = self.vel_y, self.y, self.gravedad
+        for _ in range(frames):
+            vel_y += gravedad
+            y += vel_y
+        self.vel_y, self.y = vel_y, y
+    
+    def frames_libres(self, alturas_rampa, suelo_y, margen=1e-6):
+        """Cuántos frames de vuelo pueden integrarse sin comprobar colisiones"""
+        a = self.gravedad / 2
+        b = self.vel_y + self.gravedad / 2
+        
+        def raices(nivel):
+            discriminante = b * b - 4 * a * (self.y - nivel)
+            if discriminante < 0:
+                return None
+            r = math.sqrt(discriminante)
+            return (-b - r) / (2 * a), (-b + r) / (2 * a)
+        
+        def primer_entero(desde, hasta):
+            n = max(1, math.floor(desde) + 1)
+            return n if n < hasta else None
+        
+        suelo = raices(suelo_y - margen)
+        if suelo is None:
+            return 0
+        primero = max(1, math.ceil(suelo[1]))
+        
+        for altura in alturas_rampa:
+            # Colisión cuando altura - 84 < y < altura - 44
+            bajo = raices(altura - 44 + margen)
+            if bajo is None:
+                continue
+            alto = raices(altura - 84 - margen)
+            if alto is None:
+                tramos = [bajo]
+            else:
+                tramos = [(bajo[0], min(bajo[1], alto[0])), (max(bajo[0], alto[1]), bajo[1])]
+            for desde, hasta in tramos:
+                n = primer_entero(desde, hasta)
+                if n is not None:
+                    primero = min(primero, n)
+        
+        return max(0, primero - 2)
+    
     def rotar_izquierda(self):
         if not self.en_suelo:
             self.angulo += self.rotacion_vel
@@ -214,6 +966,7 @@ class Personaje:
     def realizar_acrobacia(self, tecla):
         if not self.en_suelo and tecla in self.sprites['acrobacias']:
             self.acrobacia_actual = self.sprites['acrobacias'][tecla]
+            self.acrobacia_tecla = tecla
             self.acrobacia_timer = 20
             return True
         return False
@@ -228,7 +981,7 @@ class Personaje:
         angulo_normalizado = abs(self.angulo % 360)
         return angulo_normalizado <= 50 or angulo_normalizado >= 310
     
-    def dibujar(self, ventana, offset_x=0):
+    def dibujar(self, ventana, offset_x=0, suave=False):
         sprite = self.sprites['personaje']
         
         if self.acrobacia_actual and self.acrobacia_timer > 0:
@@ -237,7 +990,10 @@ class Personaje:
         else:
             self.acrobacia_actual = None
         
-        sprite_rotado = pygame.transform.rotate(sprite, self.angulo)
+        if suave:
+            sprite_rotado = pygame.transform.rotozoom(sprite, self.angulo, 1)
+        else:
+            sprite_rotado = pygame.transform.rotate(sprite, self.angulo)
         rect = sprite_rotado.get_rect(center=(self.x + 32, self.y + 32))
         ventana.blit(sprite_rotado, rect.topleft)
 
@@ -252,7 +1008,8 @@ class Rampa:
             (base_x + ancho, base_y + altura)
         ]
     
-    def detectar_colision(self, x_centro, y_centro, offset_x):
+    def altura_en(self, x_centro, offset_x):
+        """Altura de la superficie de la rampa en x_centro, o None si no la cubre"""
         (x1, y1), (x2, y2), (x3, y3) = self.puntos
         x1 -= offset_x
         x2 -= offset_x
@@ -260,9 +1017,13 @@ class Rampa:
         
         if x1 <= x_centro <= x2:
             pendiente = (y3 - y1) / ((x3 - x1) + 0.01)
-            altura_rampa = pendiente * (x_centro - x1) + y1
-            if abs((y_centro + 64) - altura_rampa) < 20:
-                return altura_rampa - 64
+            return pendiente * (x_centro - x1) + y1
+        return None
+    
+    def detectar_colision(self, x_centro, y_centro, offset_x):
+        altura_rampa = self.altura_en(x_centro, offset_x)
+        if altura_rampa is not None and abs((y_centro + 64) - altura_rampa) < 20:
+            return altura_rampa - 64
         return None
     
     def dibujar(self, ventana, offset_x=0):
@@ -273,24 +1034,27 @@ class Rampa:
 class GestorRampas:
     """Gestiona la generación y actualización de rampas"""
     
-    def __init__(self, suelo_y):
+    def __init__(self, suelo_y, semilla=None):
         self.rampas = []
         self.suelo_y = suelo_y
+        self.semilla = semilla
+        self.rng = random.Random(semilla)
     
     def generar_rampa(self):
-        base_x = self.rampas[-1].puntos[1][0] + random.randint(250, 400) if self.rampas else 600
+        rng = self.rng
+        base_x = self.rampas[-1].puntos[1][0] + rng.randint(250, 400) if self.rampas else 600
         base_y = self.suelo_y + 64
         
-        altura = random.choice([
-            random.randint(-150, -100),
-            random.randint(-100, -60),
-            random.randint(-60, -20)
+        altura = rng.choice([
+            rng.randint(-150, -100),
+            rng.randint(-100, -60),
+            rng.randint(-60, -20)
         ])
         
-        ancho = random.choice([
-            random.randint(100, 150),
-            random.randint(160, 220),
-            random.randint(230, 300)
+        ancho = rng.choice([
+            rng.randint(100, 150),
+            rng.randint(160, 220),
+            rng.randint(230, 300)
         ])
         
         nueva_rampa = Rampa(base_x, base_y, ancho, altura)
@@ -307,12 +1071,21 @@ class GestorRampas:
                 return colision
         return None
     
+    def alturas_en(self, x_centro, offset_x):
+        alturas = []
+        for rampa in self.rampas:
+            altura = rampa.altura_en(x_centro, offset_x)
+            if altura is not None:
+                alturas.append(altura)
+        return alturas
+    
     def dibujar(self, ventana, offset_x):
         for rampa in self.rampas:
             rampa.dibujar(ventana, offset_x)
     
     def reiniciar(self):
         self.rampas = []
+        self.rng = random.Random(self.semilla)
 
 
 class SistemaAcrobacias:
@@ -335,8 +1108,11 @@ class SistemaAcrobacias:
         self.puntos_temp = 0
     
     def registrar_acrobacia(self, tecla):
-        if tecla in self.ACROBACIAS:
+        """Marca la acrobacia; devuelve True solo la primera vez en el salto"""
+        if tecla in self.ACROBACIAS and not self.acrobacias_realizando[tecla]:
             self.acrobacias_realizando[tecla] = True
+            return True
+        return False
     
     def calcular_puntos(self):
         total = self.puntos_temp
@@ -377,6 +1153,13 @@ class SistemaCombo:
                 self.barra = 0
         self._actualizar_multiplicador()
     
+    def avanzar(self, frames):
+        """Equivale a llamar `frames` veces a actualizar()"""
+        pasos_timer = min(self.timer, frames)
+        self.timer -= pasos_timer
+        self.barra = max(0, self.barra - (frames - pasos_timer))
+        self._actualizar_multiplicador()
+    
     def _actualizar_multiplicador(self):
         self.multiplicador = 1 + self.barra / self.barra_max
     
@@ -401,12 +1184,417 @@ class SistemaVida:
         self.vida = self.vida_max
 
 
+# ==================== FANTASMAS ====================
+class SistemaFantasmas:
+    """Reproduce a la vez varias partidas grabadas como pilotos translúcidos"""
+    
+    ALFA = 110
+    
+    def __init__(self, repeticiones, sprites, suelo_y):
+        self.suelo_y = suelo_y
+        self.frame = 0
+        self._cache_rotacion = {}
+        
+        gestores = {}
+        self.personajes = []
+        self.gestores_rampas = []
+        self.offsets = []
+        self.guiones = []
+        self.cursores = []
+        self.frames_fin = []
+        for repeticion in repeticiones:
+            semilla = repeticion["semilla"]
+            if semilla not in gestores:
+                gestores[semilla] = GestorRampas(suelo_y, semilla)
+            self.personajes.append(Personaje(ANCHO // 2, ALTO - 150, sprites))
+            self.gestores_rampas.append(gestores[semilla])
+            self.offsets.append(0)
+            self.guiones.append([(f, TeclasPulsadas(t)) for f, t in repeticion["cambios"]])
+            self.cursores.append(-1)
+            self.frames_fin.append(repeticion["frames"])
+        
+        self.activos = list(range(len(self.personajes)))
+    
+    def actualizar(self):
+        """Avanza un frame todos los fantasmas, con la misma lógica que EstadoJugando"""
+        frame = self.frame
+        terminados = False
+        
+        for i in self.activos:
+            if frame >= self.frames_fin[i]:
+                terminados = True
+                continue
+            
+            personaje = self.personajes[i]
+            gestor = self.gestores_rampas[i]
+            guion = self.guiones[i]
+            
+            # Entradas: el cursor solo avanza cuando hay un cambio en este frame
+            cursor = self.cursores[i]
+            salto = False
+            if cursor + 1 < len(guion) and guion[cursor + 1][0] == frame:
+                cursor += 1
+                self.cursores[i] = cursor
+                anteriores = guion[cursor - 1][1] if cursor > 0 else TeclasPulsadas()
+                salto = pygame.K_SPACE in guion[cursor][1] and pygame.K_SPACE not in anteriores
+            teclas = guion[cursor][1] if cursor >= 0 else TeclasPulsadas()
+            
+            if salto:
+                personaje.saltar()
+            
+            if teclas[pygame.K_RIGHT]:
+                self.offsets[i] += 5
+            if teclas[pygame.K_LEFT]:
+                self.offsets[i] = max(0, self.offsets[i] - 5)
+            offset_x = self.offsets[i]
+            
+            if not personaje.en_suelo:
+                if teclas[pygame.K_a]:
+                    personaje.rotar_izquierda()
+                if teclas[pygame.K_d]:
+                    personaje.rotar_derecha()
+                for tecla in SistemaAcrobacias.ACROBACIAS:
+                    if teclas[tecla]:
+                        personaje.realizar_acrobacia(tecla)
+            if personaje.acrobacia_timer > 0:
+                personaje.acrobacia_timer -= 1
+            
+            personaje.actualizar_fisica()
+            colision = gestor.detectar_colision(personaje.x, personaje.y, offset_x)
+            if colision is not None:
+                personaje.aterrizar(colision)
+            elif personaje.y >= self.suelo_y:
+                personaje.aterrizar(self.suelo_y)
+            gestor.actualizar(offset_x, ANCHO)
+        
+        if terminados:
+            self.activos = [i for i in self.activos if frame < self.frames_fin[i]]
+        self.frame += 1
+    
+    def avanzar_hasta(self, frame):
+        while self.frame < frame:
+            self.actualizar()
+    
+    def _sprite_rotado(self, sprite, angulo):
+        clave = (id(sprite), angulo % 360)
+        rotado = self._cache_rotacion.get(clave)
+        if rotado is None:
+            rotado = pygame.transform.rotate(sprite, angulo % 360)
+            rotado.set_alpha(self.ALFA)
+            self._cache_rotacion[clave] = rotado
+        return rotado
+    
+    def dibujar(self, ventana, offset_x, maximo=None):
+        """Dibuja como mucho `maximo` fantasmas visibles, empezando por los mejores"""
+        ancho = ventana.get_width()
+        lote = []
+        for i in self.activos:
+            if maximo is not None and len(lote) >= maximo:
+                break
+            personaje = self.personajes[i]
+            # Posición en pantalla relativa a la cámara del jugador
+            x = personaje.x + self.offsets[i] - offset_x
+            if x < -64 or x > ancho:
+                continue
+            
+            if personaje.acrobacia_actual is not None and personaje.acrobacia_timer > 0:
+                sprite = personaje.acrobacia_actual
+            else:
+                sprite = personaje.sprites['personaje']
+            rotado = self._sprite_rotado(sprite, personaje.angulo)
+            lote.append((rotado, (
+                x + 32 - rotado.get_width() // 2,
+                personaje.y + 32 - rotado.get_height() // 2
+            )))
+        
+        if lote:
+            ventana.blits(lote, doreturn=False)
+
+
+# ==================== REBOBINADO ====================
+class BufferInstantaneas:
+    """Buffer circular de instantáneas de tamaño fijo sobre un bytearray preasignado"""
+    
+    def __init__(self, tamano_registro, capacidad):
+        self.tamano_registro = tamano_registro
+        self.capacidad = capacidad
+        self.datos = bytearray(tamano_registro * capacidad)
+        self.frames = [-1] * capacidad
+        self.siguiente = 0
+    
+    def reservar(self, frame):
+        i = self.siguiente
+        self.frames[i] = frame
+        self.siguiente = (i + 1) % self.capacidad
+        return i * self.tamano_registro
+    
+    def mas_cercana(self, frame):
+        """(frame, desplazamiento) de la instantánea más reciente no posterior a `frame`"""
+        mejor = None
+        for i, frame_i in enumerate(self.frames):
+            if 0 <= frame_i <= frame and (mejor is None or frame_i > self.frames[mejor]):
+                mejor = i
+        if mejor is None:
+            return None
+        return self.frames[mejor], mejor * self.tamano_registro
+    
+    def mas_antigua(self):
+        validos = [frame for frame in self.frames if frame >= 0]
+        return min(validos) if validos else None
+    
+    def descartar_posteriores(self, frame):
+        for i, frame_i in enumerate(self.frames):
+            if frame_i > frame:
+                self.frames[i] = -1
+        # Las siguientes instantáneas ocupan los huecos liberados, no las más antiguas
+        validos = [i for i, frame_i in enumerate(self.frames) if frame_i >= 0]
+        ultimo = max(validos, key=self.frames.__getitem__) if validos else -1
+        self.siguiente = (ultimo + 1) % self.capacidad
+
+
+class PersistidorPartida(threading.Thread):
+    """Guarda en disco la última instantánea de la partida desde un hilo propio"""
+    
+    ARCHIVO = f"{RUTA_DATA}reanudar.json"
+    VERSION = 1
+    
+    def __init__(self):
+        super().__init__(name="reanudar", daemon=True)
+        self._cola = queue.Queue(maxsize=1)
+    
+    @classmethod
+    def cargar(cls):
+        try:
+            if os.path.exists(cls.ARCHIVO):
+                with open(cls.ARCHIVO, "r") as file:
+                    datos = json.load(file)
+                if datos.get("version") != cls.VERSION:
+                    print("La partida guardada es de otra versión del juego; se ignora")
+                    return None
+                datos["instantanea"] = base64.b64decode(datos["instantanea"])
+                return datos
+        except Exception as e:
+            print(f"No se pudo leer la partida guardada: {e}")
+        return None
+    
+    def guardar(self, datos):
+        self._poner(datos)
+    
+    def borrar(self):
+        self._poner(None)
+    
+    def _poner(self, trabajo):
+        # Solo interesa el último trabajo: se sustituye el pendiente si lo hay
+        try:
+            self._cola.get_nowait()
+            self._cola.task_done()
+        except queue.Empty:
+            pass
+        self._cola.put(trabajo)
+    
+    def esperar(self):
+        if self.is_alive():
+            self._cola.join()
+    
+    def run(self):
+        while True:
+            datos = self._cola.get()
+            try:
+                if datos is None:
+                    if os.path.exists(self.ARCHIVO):
+                        os.remove(self.ARCHIVO)
+                    continue
+                datos = dict(datos, instantanea=base64.b64encode(datos["instantanea"]).decode())
+                datos["grabacion"] = {
+                    "semilla": datos["semilla"],
+                    "frames": datos["frame"],
+                    "cambios": [[f, sorted(t)] for f, t in datos["grabacion"]],
+                }
+                os.makedirs(os.path.dirname(self.ARCHIVO), exist_ok=True)
+                temporal = self.ARCHIVO + ".tmp"
+                with open(temporal, "w") as file:
+                    json.dump(datos, file)
+                os.replace(temporal, self.ARCHIVO)
+            except Exception as e:
+                print(f"No se pudo guardar la partida: {e}")
+            finally:
+                self._cola.task_done()
+
+
+class SistemaRebobinado:
+    """Instantáneas compactas de EstadoJugando para rebobinar y reanudar"""
+    
+    # frame, personaje (y, vel_y, angulo, en_suelo, tecla y timer de acrobacia),
+    # acrobacias (máscara, puntos_temp), combo (barra, timer), vida, puntos, offset_x, rampas
+    FORMATO = struct.Struct("<IddiBiiBiqiiqqI")
+    # y, vel_y, angulo, en_suelo, tecla y timer de acrobacia, offset_x, cursor
+    FORMATO_FANTASMA = struct.Struct("<ddiBiiqi")
+    
+    def __init__(self, estado, cada=REBOBINADO_CADA, segundos=REBOBINADO_SEGUNDOS,
+                 presupuesto=REBOBINADO_PRESUPUESTO, persistidor=None):
+        self.estado = estado
+        self.cada = cada
+        self.persistidor = persistidor
+        self.ultimo = None
+        self.ultimo_persistido = 0
+        self._teclas_acrobacias = list(SistemaAcrobacias.ACROBACIAS)
+        
+        tamano = self.FORMATO.size + self.FORMATO_FANTASMA.size * len(estado.fantasmas.personajes)
+        capacidad = max(2, min(segundos * 60 // cada, presupuesto // tamano))
+        self.buffer = BufferInstantaneas(tamano, capacidad)
+    
+    # --- Empaquetado ---
+    def _escribir(self, datos, desplazamiento):
+        estado = self.estado
+        p = estado.personaje
+        acrobacias = estado.sistema_acrobacias
+        mascara = 0
+        for bit, tecla in enumerate(self._teclas_acrobacias):
+            if acrobacias.acrobacias_realizando[tecla]:
+                mascara |= 1 << bit
+        self.FORMATO.pack_into(
+            datos, desplazamiento, estado.grabador.frame,
+            p.y, p.vel_y, p.angulo, p.en_suelo,
+            p.acrobacia_tecla if p.acrobacia_actual is not None else 0, p.acrobacia_timer,
+            mascara, acrobacias.puntos_temp,
+            estado.sistema_combo.barra, estado.sistema_combo.timer,
+            estado.sistema_vida.vida, estado.puntos, estado.offset_x,
+            len(estado.gestor_rampas.rampas)
+        )
+        
+        fantasmas = estado.fantasmas
+        desplazamiento += self.FORMATO.size
+        for i, f in enumerate(fantasmas.personajes):
+            self.FORMATO_FANTASMA.pack_into(
+                datos, desplazamiento, f.y, f.vel_y, f.angulo, f.en_suelo,
+                f.acrobacia_tecla if f.acrobacia_actual is not None else 0, f.acrobacia_timer,
+                fantasmas.offsets[i], fantasmas.cursores[i]
+            )
+            desplazamiento += self.FORMATO_FANTASMA.size
+    
+    def _leer(self, datos, desplazamiento, con_fantasmas=True):
+        estado = self.estado
+        (frame, y, vel_y, angulo, en_suelo, tecla, timer, mascara, puntos_temp,
+         barra, timer_combo, vida, puntos, offset_x, rampas) = self.FORMATO.unpack_from(datos, desplazamiento)
+        
+        self._restaurar_personaje(estado.personaje, y, vel_y, angulo, en_suelo, tecla, timer)
+        acrobacias = estado.sistema_acrobacias
+        for bit, tecla_acrobacia in enumerate(self._teclas_acrobacias):
+            acrobacias.acrobacias_realizando[tecla_acrobacia] = bool(mascara & (1 << bit))
+        acrobacias.puntos_temp = puntos_temp
+        estado.sistema_combo.barra = barra
+        estado.sistema_combo.timer = timer_combo
+        estado.sistema_combo._actualizar_multiplicador()
+        estado.sistema_vida.vida = vida
+        estado.puntos = puntos
+        estado.offset_x = offset_x
+        estado.contador_mensaje = 0
+        estado.grabador.truncar(frame)
+        
+        # El generador de rampas se reconstruye desde la semilla
+        gestor = estado.gestor_rampas
+        if len(gestor.rampas) != rampas:
+            gestor.reiniciar()
+            for _ in range(rampas):
+                gestor.generar_rampa()
+        
+        fantasmas = estado.fantasmas
+        if not con_fantasmas:
+            fantasmas.avanzar_hasta(frame)
+            return frame
+        desplazamiento += self.FORMATO.size
+        for i, f in enumerate(fantasmas.personajes):
+            (y, vel_y, angulo, en_suelo, tecla, timer,
+             offset, cursor) = self.FORMATO_FANTASMA.unpack_from(datos, desplazamiento)
+            self._restaurar_personaje(f, y, vel_y, angulo, en_suelo, tecla, timer)
+            fantasmas.offsets[i] = offset
+            fantasmas.cursores[i] = cursor
+            desplazamiento += self.FORMATO_FANTASMA.size
+        fantasmas.frame = frame
+        fantasmas.activos = [i for i, fin in enumerate(fantasmas.frames_fin) if fin >= frame]
+        return frame
+    
+    def _restaurar_personaje(self, personaje, y, vel_y, angulo, en_suelo, tecla, timer):
+        personaje.y = y
+        personaje.vel_y = vel_y
+        personaje.angulo = angulo
+        personaje.en_suelo = bool(en_suelo)
+        personaje.acrobacia_tecla = tecla or None
+        personaje.acrobacia_actual = personaje.sprites['acrobacias'][tecla] if tecla else None
+        personaje.acrobacia_timer = timer
+    
+    # --- Uso desde EstadoJugando ---
+    def tras_frame(self):
+        frame = self.estado.grabador.frame
+        if self.ultimo is not None and frame - self.ultimo < self.cada:
+            return
+        self.ultimo = frame
+        self._escribir(self.buffer.datos, self.buffer.reservar(frame))
+        
+        if self.persistidor is not None and frame - self.ultimo_persistido >= PERSISTIR_CADA:
+            self.ultimo_persistido = frame
+            self.persistir()
+    
+    def persistir(self):
+        estado = self.estado
+        instantanea = bytearray(self.buffer.tamano_registro)
+        self._escribir(instantanea, 0)
+        self.persistidor.guardar({
+            "version": PersistidorPartida.VERSION,
+            "telemetria": [estado.juego.telemetria.sesion, estado.juego.telemetria.partida],
+            "semilla": estado.semilla,
+            "torneo": estado.torneo,
+            "fantasmas": len(estado.fantasmas.personajes),
+            "frame": estado.grabador.frame,
+            "instantanea": bytes(instantanea),
+            "grabacion": list(estado.grabador.cambios),
+        })
+    
+    def rebobinar(self, frames):
+        """Vuelve `frames` frames atrás, sin pasar de la instantánea más antigua"""
+        antigua = self.buffer.mas_antigua()
+        if antigua is None:
+            return
+        self.ir_a(max(antigua, self.estado.grabador.frame - frames))
+    
+    def ir_a(self, objetivo):
+        estado = self.estado
+        cercana = self.buffer.mas_cercana(objetivo)
+        if cercana is None:
+            return
+        frame, desplazamiento = cercana
+        guion = GuionEntradas(estado.grabador.cambios)
+        self._leer(self.buffer.datos, desplazamiento)
+        self.buffer.descartar_posteriores(frame)
+        self.ultimo = frame
+        estado.repetir(guion, frame, objetivo)
+        estado.juego.telemetria.frame = objetivo
+    
+    def reanudar(self, datos):
+        """Restaura una partida guardada por PersistidorPartida"""
+        estado = self.estado
+        con_fantasmas = datos["fantasmas"] == len(estado.fantasmas.personajes)
+        self._leer(datos["instantanea"], 0, con_fantasmas)
+        estado.grabador.cargar(datos["grabacion"])
+        self.buffer.descartar_posteriores(-1)
+        self.ultimo = None
+        self.ultimo_persistido = estado.grabador.frame
+        estado.juego.telemetria.frame = estado.grabador.frame
+        self.tras_frame()
+        if self.persistidor is not None:
+            self.persistir()
+
+
 # ==================== ESTADOS DEL JUEGO ====================
 class Estado(ABC):
     """Clase base para los estados del juego"""
     
+    # Estados vivos, para detectar los que Juego.cambiar_estado recrea y nunca se liberan
+    instancias = weakref.WeakSet()
+    
     def __init__(self, juego):
         self.juego = juego
+        Estado.instancias.add(self)
     
     @abstractmethod
     def manejar_eventos(self, eventos):
@@ -426,7 +1614,18 @@ class MenuPrincipal(Estado):
     
     def __init__(self, juego):
         super().__init__(juego)
-        self.opciones = ["Jugar", "Puntajes", "Créditos", "Salir"]
+        self.opciones = ["Jugar", "Torneo", "Puntajes", "Créditos", "Salir"]
+        self.seleccionado = 0
+        self.partida_guardada = PersistidorPartida.cargar() if juego.persistidor else None
+        if self.partida_guardada is not None:
+            self.opciones.insert(0, "Continuar")
+    
+    def olvidar_partida_guardada(self):
+        """Quita "Continuar": al empezar cualquier partida se sustituye o se borra su archivo"""
+        if self.partida_guardada is None:
+            return
+        self.partida_guardada = None
+        self.opciones.remove("Continuar")
         self.seleccionado = 0
     
     def manejar_eventos(self, eventos):
@@ -440,15 +1639,19 @@ class MenuPrincipal(Estado):
                     self._ejecutar_opcion()
     
     def _ejecutar_opcion(self):
-        if self.seleccionado == 0:  # Jugar
+        opcion = self.opciones[self.seleccionado]
+        if opcion == "Continuar":  # Partida interrumpida por un cierre inesperado
+            self.juego.cambiar_estado('jugando', reanudar=self.partida_guardada)
+        elif opcion == "Jugar":
             self.juego.cambiar_estado('jugando')
-        elif self.seleccionado == 1:  # Puntajes
+        elif opcion == "Torneo":  # Pista fija contra los fantasmas
+            self.juego.cambiar_estado('jugando', torneo=True)
+        elif opcion == "Puntajes":
             self.juego.cambiar_estado('puntajes')
-        elif self.seleccionado == 2:  # Créditos
+        elif opcion == "Créditos":
             self.juego.cambiar_estado('creditos')
-        elif self.seleccionado == 3:  # Salir
-            pygame.quit()
-            sys.exit()
+        elif opcion == "Salir":
+            self.juego.salir()
     
     def actualizar(self):
         pass
@@ -470,7 +1673,7 @@ class MenuPrincipal(Estado):
         for i, opcion in enumerate(self.opciones):
             color = AMARILLO if i == self.seleccionado else BLANCO
             texto = recursos.fuentes['menu'].render(opcion, True, color)
-            texto_rect = texto.get_rect(center=(ANCHO//2, 300 + i * 60))
+            texto_rect = texto.get_rect(center=(ANCHO//2, 260 + i * 47))
             ventana.blit(texto, texto_rect)
             
             if i == self.seleccionado:
@@ -487,13 +1690,27 @@ class MenuPrincipal(Estado):
 class EstadoJugando(Estado):
     """Estado principal del juego"""
     
-    def __init__(self, juego):
+    def __init__(self, juego, torneo=False, semilla=None):
         super().__init__(juego)
+        self.torneo = torneo
+        self.semilla_fija = SEMILLA_TORNEO if torneo else semilla
+        self.fuente_teclas = pygame.key.get_pressed
         self.reiniciar()
     
+    @classmethod
+    def reanudada(cls, juego, datos):
+        estado = cls(juego, datos["torneo"], datos["semilla"])
+        estado.rebobinado.reanudar(datos)
+        return estado
+    
     def reiniciar(self):
+        if self.semilla_fija is not None:
+            self.semilla = self.semilla_fija
+        else:
+            self.semilla = random.randrange(2 ** 32)
+        
         self.personaje = Personaje(ANCHO // 2, ALTO - 150, self.juego.recursos.sprites)
-        self.gestor_rampas = GestorRampas(ALTO - 100)
+        self.gestor_rampas = GestorRampas(ALTO - 100, self.semilla)
         self.sistema_acrobacias = SistemaAcrobacias()
         self.sistema_combo = SistemaCombo()
         self.sistema_vida = SistemaVida()
@@ -506,18 +1723,89 @@ class EstadoJugando(Estado):
         self.mensaje = ""
         self.mensaje_color = ROJO
         self.contador_mensaje = 0
+        self._cache_hud = {}
+        self._frame_hud = 0
+        self.silencioso = False
+        
+        # Grabación de entradas y fantasmas de las mejores partidas en esta pista
+        self.grabador = GrabadorEntradas(self.semilla)
+        self._salto_pedido = False
+        self._rebobinando = False
+        self.fantasmas = SistemaFantasmas(
+            self.juego.gestor_puntajes.repeticiones.mejores(self.semilla, FANTASMAS_MAX),
+            self.juego.recursos.sprites, self.suelo_y
+        )
+        
+        # Instantáneas para rebobinar y para reanudar tras un corte
+        self.rebobinado = SistemaRebobinado(self, persistidor=self.juego.persistidor)
+        self.rebobinado.tras_frame()
     
     def manejar_eventos(self, eventos):
         for evento in eventos:
             if evento.type == pygame.KEYDOWN:
                 if evento.key == pygame.K_SPACE:
+                    self._salto_pedido = True
                     if self.personaje.saltar():
                         self.sistema_acrobacias.reiniciar()
+                        self.juego.telemetria.emitir('salto')
                 elif evento.key == pygame.K_ESCAPE:
+                    self.abandonar()
                     self.juego.cambiar_estado('menu')
     
     def actualizar(self):
-        teclas = pygame.key.get_pressed()
+        teclas = self.fuente_teclas()
+        
+        # Mantener R rebobina la partida al doble de velocidad
+        if teclas[pygame.K_r]:
+            self._salto_pedido = False
+            self._rebobinando = True
+            self.rebobinado.rebobinar(2)
+            return
+        
+        self._terminar_rebobinado()
+        self._avanzar(teclas)
+    
+    def _terminar_rebobinado(self):
+        """Emite un único evento `rebobinado` por pulsación de R, con el frame final"""
+        if self._rebobinando:
+            self._rebobinando = False
+            self.juego.telemetria.emitir('rebobinado', self.grabador.frame)
+    
+    def entradas_guion(self, guion, frame):
+        """Toma las teclas de `guion` en `frame` como pulsadas y devuelve sus eventos KEYDOWN"""
+        teclas = guion.teclas(frame)
+        self.fuente_teclas = lambda: teclas
+        return guion.eventos(frame)
+    
+    def repetir(self, guion, desde, hasta):
+        """Vuelve a jugar los frames [desde, hasta) con las entradas de `guion`, sin sonido ni telemetría"""
+        fuente_teclas = self.fuente_teclas
+        telemetria_activa = self.juego.telemetria.activo
+        self.juego.telemetria.activo = False
+        self.silencioso = True
+        try:
+            for frame in range(desde, hasta):
+                self.manejar_eventos(self.entradas_guion(guion, frame))
+                self._avanzar(self.fuente_teclas())
+        finally:
+            self.fuente_teclas = fuente_teclas
+            self.juego.telemetria.activo = telemetria_activa
+            self.silencioso = False
+    
+    def abandonar(self):
+        """Termina la partida sin Game Over (ESC o cierre de la ventana)"""
+        self._terminar_rebobinado()
+        self.juego.telemetria.emitir('fin_partida', self.puntos)
+        self._borrar_partida_guardada()
+    
+    def _borrar_partida_guardada(self):
+        if self.juego.persistidor is not None:
+            self.juego.persistidor.borrar()
+    
+    def _avanzar(self, teclas):
+        self.grabador.registrar(teclas, self._salto_pedido)
+        self._salto_pedido = False
+        self.fantasmas.actualizar()
         
         # Movimiento de cámara
         if teclas[pygame.K_RIGHT]:
@@ -537,7 +1825,9 @@ class EstadoJugando(Estado):
             for tecla in self.sistema_acrobacias.ACROBACIAS:
                 if teclas[tecla]:
                     if self.personaje.realizar_acrobacia(tecla):
-                        self.sistema_acrobacias.registrar_acrobacia(tecla)
+                        if self.sistema_acrobacias.registrar_acrobacia(tecla):
+                            nombre, valor = self.sistema_acrobacias.ACROBACIAS[tecla]
+                            self.juego.telemetria.emitir('acrobacia', nombre, valor)
         
         # Actualizar físicas
         self.personaje.actualizar_fisica()
@@ -557,28 +1847,82 @@ class EstadoJugando(Estado):
                 self._procesar_aterrizaje()
             self.personaje.aterrizar(self.suelo_y)
         
+        # Tras el Game Over no se guarda nada más: la partida ya terminó
+        if self.juego.estado_actual is not self:
+            return
+        
         # Generar rampas
         self.gestor_rampas.actualizar(self.offset_x, ANCHO)
         
-        # Actualizar mensajes
-        if self.contador_mensaje > 0:
-            self.contador_mensaje -= 1
+        self._cerrar_frames(1)
+    
+    def avanzar_sin_entrada(self, limite):
+        """Salta hasta `limite` frames sin entrada; devuelve los frames avanzados"""
+        if limite <= 0 or not self.gestor_rampas.rampas:
+            return 0
+        
+        personaje = self.personaje
+        if personaje.en_suelo:
+            destino = self._destino_en_reposo()
+            if destino is None:
+                return 0
+            frames = limite
+            personaje.aterrizar(destino)
+        else:
+            alturas = self.gestor_rampas.alturas_en(personaje.x, self.offset_x)
+            frames = min(limite, personaje.frames_libres(alturas, self.suelo_y))
+            if frames <= 0:
+                return 0
+            personaje.avanzar_vuelo(frames)
+        
+        self.sistema_combo.avanzar(frames)
+        self.grabador.avanzar(frames)
+        for _ in range(frames if self.fantasmas.activos else 0):
+            self.fantasmas.actualizar()
+        self._cerrar_frames(frames)
+        return frames
+    
+    def _cerrar_frames(self, frames):
+        """Mensajes, frame de telemetría e instantáneas; común a _avanzar y avanzar_sin_entrada"""
+        self.contador_mensaje = max(0, self.contador_mensaje - frames)
+        self.juego.telemetria.frame = self.grabador.frame
+        self.rebobinado.tras_frame()
+    
+    def _destino_en_reposo(self):
+        """Altura a la que vuelve el personaje tras un frame si está en reposo, o None"""
+        personaje = self.personaje
+        if personaje.vel_y != 0 or personaje.angulo != 0:
+            return None
+        
+        # Mismas operaciones que actualizar() para un frame sin entrada
+        y = personaje.y + (personaje.vel_y + personaje.gravedad)
+        destino = self.gestor_rampas.detectar_colision(personaje.x, y, self.offset_x)
+        if destino is None:
+            if y < self.suelo_y:
+                return None
+            destino = self.suelo_y
+        return destino if destino == personaje.y else None
     
     def _procesar_aterrizaje(self):
-        if self.personaje.verificar_aterrizaje_correcto():
+        correcto = self.personaje.verificar_aterrizaje_correcto()
+        self.juego.telemetria.emitir(
+            'aterrizaje', self.personaje.angulo, self.personaje.angulo % 360, correcto
+        )
+        if correcto:
             self._aterrizaje_exitoso()
         else:
             self._aterrizaje_fallido()
     
     def _aterrizaje_exitoso(self):
-        if self.juego.recursos.sonidos['exito']:
-            self.juego.recursos.sonidos['exito'].play()
+        if not self.silencioso:
+            self.juego.recursos.audio.reproducir('exito')
         
         puntos_base = self.sistema_acrobacias.calcular_puntos()
         self.sistema_combo.agregar_combo(puntos_base)
         
         puntos_totales = int(puntos_base * self.sistema_combo.multiplicador)
         self.puntos += puntos_totales
+        self.juego.telemetria.emitir('combo', self.sistema_combo.multiplicador, puntos_totales)
         
         self.mensaje = f"¡Aterrizaje! +{puntos_totales} pts (x{self.sistema_combo.multiplicador:.1f})"
         self.mensaje_color = VERDE
@@ -587,8 +1931,8 @@ class EstadoJugando(Estado):
         self.juego.gestor_puntajes.guardar_record(self.puntos)
     
     def _aterrizaje_fallido(self):
-        if self.juego.recursos.sonidos['fallo']:
-            self.juego.recursos.sonidos['fallo'].play()
+        if not self.silencioso:
+            self.juego.recursos.audio.reproducir('fallo')
         
         mensajes_fallidos = [
             "¡Ese bache era invisible, lo juro!",
@@ -602,14 +1946,19 @@ class EstadoJugando(Estado):
         self.mensaje_color = ROJO
         self.contador_mensaje = 120
         
-        if self.sistema_vida.perder_vida():
-            self.juego.gestor_puntajes.guardar_puntaje(self.puntos)
+        perdio = self.sistema_vida.perder_vida()
+        self.juego.telemetria.emitir('vida_perdida', self.sistema_vida.vida)
+        if perdio:
+            self.juego.telemetria.emitir('fin_partida', self.puntos)
+            self.juego.gestor_puntajes.guardar_puntaje(self.puntos, self.grabador.repeticion())
+            self._borrar_partida_guardada()
             self.juego.cambiar_estado('game_over', puntos_finales=self.puntos)
         
         self.sistema_combo.reiniciar()
     
     def dibujar(self, ventana):
-        ventana.blit(self.juego.recursos.fondo, (0, 0))
+        calidad = self.juego.calidad
+        self.juego.recursos.fondo.dibujar(ventana, self.offset_x, calidad['capas_parallax'])
         
         # Suelo
         pygame.draw.rect(ventana, GRIS, (0, self.suelo_y + 64, ANCHO, 100))
@@ -617,21 +1966,37 @@ class EstadoJugando(Estado):
         # Rampas
         self.gestor_rampas.dibujar(ventana, self.offset_x)
         
+        # Fantasmas
+        self.fantasmas.dibujar(ventana, self.offset_x, calidad['fantasmas'])
+        
         # Personaje
-        self.personaje.dibujar(ventana, self.offset_x)
+        self.personaje.dibujar(ventana, self.offset_x, calidad['rotacion_suave'])
         
         # UI
         self._dibujar_ui(ventana)
     
+    def _texto_hud(self, clave, fuente, texto, color, contador=False):
+        """Devuelve el texto renderizado desde la caché"""
+        cache = self._cache_hud.get(clave)
+        if cache is not None:
+            contenido, superficie, frame = cache
+            if contenido == (texto, color):
+                return superficie
+            if contador and self._frame_hud - frame < self.juego.calidad['hud_cada']:
+                return superficie
+        superficie = self.juego.recursos.fuentes[fuente].render(texto, True, color)
+        self._cache_hud[clave] = ((texto, color), superficie, self._frame_hud)
+        return superficie
+    
     def _dibujar_ui(self, ventana):
-        recursos = self.juego.recursos
+        self._frame_hud += 1
         
         # Puntos y récord
-        texto_puntos = recursos.fuentes['menu'].render(f"Puntos: {self.puntos}", True, BLANCO)
+        texto_puntos = self._texto_hud('puntos', 'menu', f"Puntos: {self.puntos}", BLANCO, contador=True)
         ventana.blit(texto_puntos, (20, 20))
         
-        texto_record = recursos.fuentes['texto'].render(
-            f"Récord: {self.juego.gestor_puntajes.record}", True, AZUL
+        texto_record = self._texto_hud(
+            'record', 'texto', f"Récord: {self.juego.gestor_puntajes.record}", AZUL, contador=True
         )
         ventana.blit(texto_record, (20, 60))
         
@@ -644,14 +2009,14 @@ class EstadoJugando(Estado):
         pygame.draw.rect(ventana, GRIS, (20, 140, 200, 25))
         ancho_combo = int((self.sistema_combo.barra / self.sistema_combo.barra_max) * 200)
         pygame.draw.rect(ventana, AMARILLO, (20, 140, ancho_combo, 25))
-        texto_combo = recursos.fuentes['texto'].render(
-            f"Combo x{self.sistema_combo.multiplicador:.1f}", True, BLANCO
+        texto_combo = self._texto_hud(
+            'combo', 'texto', f"Combo x{self.sistema_combo.multiplicador:.1f}", BLANCO, contador=True
         )
         ventana.blit(texto_combo, (230, 140))
         
         # Mensajes
         if self.contador_mensaje > 0:
-            texto = recursos.fuentes['menu'].render(self.mensaje, True, self.mensaje_color)
+            texto = self._texto_hud('mensaje', 'menu', self.mensaje, self.mensaje_color)
             ventana.blit(texto, (ANCHO // 2 - texto.get_width() // 2, 180))
         
         # Controles (solo al inicio)
@@ -660,11 +2025,12 @@ class EstadoJugando(Estado):
                 "ESPACIO: Saltar",
                 "A/D: Rotar",
                 "W/S/Q/A: Acrobacias",
+                "R: Rebobinar",
                 "←/→: Mover cámara",
                 "ESC: Menú"
             ]
             for i, control in enumerate(controles):
-                texto = recursos.fuentes['pequeña'].render(control, True, GRIS_CLARO)
+                texto = self._texto_hud(f"control_{i}", 'pequeña', control, GRIS_CLARO)
                 ventana.blit(texto, (ANCHO - 200, 20 + i * 20))
 
 
@@ -684,6 +2050,7 @@ class EstadoPuntajes(Estado):
         ventana.fill(AZUL_OSCURO)
         recursos = self.juego.recursos
         gestor = self.juego.gestor_puntajes
+        puntajes_altos, compartido = gestor.mejores_puntajes()
         
         # Título
         titulo = recursos.fuentes['titulo'].render("MEJORES PUNTAJES", True, AMARILLO)
@@ -695,13 +2062,21 @@ class EstadoPuntajes(Estado):
         record_rect = record_texto.get_rect(center=(ANCHO//2, 130))
         ventana.blit(record_texto, record_rect)
         
+        origen = "Marcador compartido" if compartido else "Marcador local"
+        origen_texto = recursos.fuentes['pequeña'].render(origen, True, GRIS_CLARO)
+        ventana.blit(origen_texto, origen_texto.get_rect(center=(ANCHO//2, 160)))
+        
         # Lista de puntajes
-        if gestor.puntajes_altos:
-            for i, puntaje in enumerate(gestor.puntajes_altos[:10]):
+        if puntajes_altos:
+            for i, puntaje in enumerate(puntajes_altos[:10]):
                 y_pos = 180 + i * 35
                 posicion = recursos.fuentes['texto'].render(f"{i+1}.", True, BLANCO)
                 puntos = recursos.fuentes['texto'].render(f"{puntaje['puntos']} pts", True, AMARILLO)
-                fecha = recursos.fuentes['pequeña'].render(puntaje['fecha'], True, GRIS_CLARO)
+                # Las entradas del marcador compartido vienen de otras cabinas
+                texto_fecha = puntaje.get('fecha', '')
+                if not isinstance(texto_fecha, str):
+                    texto_fecha = ''
+                fecha = recursos.fuentes['pequeña'].render(texto_fecha, True, GRIS_CLARO)
                 
                 ventana.blit(posicion, (200, y_pos))
                 ventana.blit(puntos, (250, y_pos))
@@ -846,17 +2221,754 @@ class EstadoGameOver(Estado):
         ventana.blit(continuar, continuar_rect)
 
 
+# ==================== SIMULACIÓN SIN VENTANA ====================
+class TeclasPulsadas(frozenset):
+    """Conjunto de teclas que se consulta como pygame.key.get_pressed()"""
+    
+    def __getitem__(self, tecla):
+        return tecla in self
+
+
+class GuionEntradas:
+    """Entradas programadas: lista de (frame, teclas pulsadas desde ese frame)"""
+    
+    def __init__(self, cambios=()):
+        self.cambios = sorted((frame, TeclasPulsadas(teclas)) for frame, teclas in cambios)
+        self._frames = [frame for frame, _ in self.cambios]
+    
+    def teclas(self, frame):
+        i = bisect_right(self._frames, frame) - 1
+        return self.cambios[i][1] if i >= 0 else TeclasPulsadas()
+    
+    def eventos(self, frame):
+        """KEYDOWN de las teclas que pasan a estar pulsadas en este frame"""
+        nuevas = self.teclas(frame) - self.teclas(frame - 1)
+        return [pygame.event.Event(pygame.KEYDOWN, key=tecla) for tecla in sorted(nuevas)]
+    
+    def proximo_cambio(self, frame):
+        i = bisect_right(self._frames, frame)
+        return self._frames[i] if i < len(self._frames) else float('inf')
+    
+    @classmethod
+    def desde_repeticion(cls, repeticion):
+        return cls(repeticion["cambios"])
+
+
+class GrabadorEntradas:
+    """Graba los cambios de entrada de una partida en el formato de GuionEntradas"""
+    
+    TECLAS = (
+        pygame.K_LEFT, pygame.K_RIGHT, pygame.K_a, pygame.K_d,
+        pygame.K_w, pygame.K_s, pygame.K_q,
+    )
+    
+    def __init__(self, semilla):
+        self.semilla = semilla
+        self.frame = 0
+        self.cambios = []
+        self._ultimas = TeclasPulsadas()
+    
+    def registrar(self, teclas, salto):
+        """Registra las teclas de este frame; ESPACIO solo cuenta en el frame del KEYDOWN"""
+        actuales = TeclasPulsadas(
+            [tecla for tecla in self.TECLAS if teclas[tecla]] + ([pygame.K_SPACE] if salto else [])
+        )
+        self._registrar(actuales)
+        self.frame += 1
+    
+    def avanzar(self, frames):
+        self._registrar(TeclasPulsadas())
+        self.frame += frames
+    
+    def truncar(self, frame):
+        self.cambios = [cambio for cambio in self.cambios if cambio[0] < frame]
+        self._ultimas = self.cambios[-1][1] if self.cambios else TeclasPulsadas()
+        self.frame = frame
+    
+    def cargar(self, repeticion):
+        self.cambios = [(frame, TeclasPulsadas(teclas)) for frame, teclas in repeticion["cambios"]]
+        self._ultimas = self.cambios[-1][1] if self.cambios else TeclasPulsadas()
+        self.frame = repeticion["frames"]
+    
+    def _registrar(self, actuales):
+        if actuales != self._ultimas:
+            self.cambios.append((self.frame, actuales))
+            self._ultimas = actuales
+    
+    def repeticion(self):
+        return {
+            "semilla": self.semilla,
+            "frames": self.frame,
+            "cambios": [[frame, sorted(teclas)] for frame, teclas in self.cambios],
+        }
+
+
+class SimulacionSinVentana:
+    """Ejecuta una partida sin reloj ni dibujo, para bots y verificación de repeticiones"""
+    
+    def __init__(self, juego, saltar_tiempo=True):
+        self.juego = juego
+        self.saltar_tiempo = saltar_tiempo
+        self.frame = 0
+        self.frames_saltados = 0
+    
+    def ejecutar(self, guion, frames):
+        if not isinstance(self.juego.estado_actual, EstadoJugando):
+            self.juego.cambiar_estado('jugando')
+        estado = self.juego.estado_actual
+        
+        while self.frame < frames and self.juego.estado_actual is estado:
+            teclas = guion.teclas(self.frame)
+            
+            if self.saltar_tiempo and not teclas:
+                limite = min(guion.proximo_cambio(self.frame), frames) - self.frame
+                avanzados = estado.avanzar_sin_entrada(limite)
+                if avanzados:
+                    self.frame += avanzados
+                    self.frames_saltados += avanzados
+                    continue
+            
+            estado.manejar_eventos(estado.entradas_guion(guion, self.frame))
+            estado.actualizar()
+            self.frame += 1
+        
+        return estado
+
+
+def guion_bot(rng, frames):
+    """Entradas de un bot: saltos seguidos de rotaciones, acrobacias o avances de cámara"""
+    cambios = []
+    frame = 0
+    while frame < frames:
+        cambios.append((frame, {pygame.K_SPACE}))
+        frame += 1
+        cambios.append((frame, set()))
+        frame += rng.randint(0, 8)
+        tecla = rng.choice([pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_q, pygame.K_RIGHT, None])
+        if tecla is not None:
+            cambios.append((frame, {tecla}))
+            frame += rng.randint(1, 40)
+            cambios.append((frame, set()))
+        frame += rng.randint(20, 200)
+    return GuionEntradas(cambios)
+
+
+def _estado_piloto(personaje, offset_x):
+    return personaje.y, personaje.vel_y, personaje.angulo, personaje.en_suelo, offset_x
+
+
+def _estado_partida(partida):
+    combo = partida.sistema_combo
+    return (
+        _estado_piloto(partida.personaje, partida.offset_x), partida.puntos,
+        partida.sistema_vida.vida, combo.barra, combo.timer, combo.multiplicador,
+        partida.contador_mensaje, len(partida.gestor_rampas.rampas), partida.grabador.repeticion(),
+    )
+
+
+def verificar_simulacion(juego, semillas=range(4), frames=20000):
+    """Compara con la simulación frame a frame el salto de tiempo y los fantasmas"""
+    errores = []
+    for semilla in semillas:
+        guion = guion_bot(random.Random(semilla), frames)
+        
+        # Referencia: frame a frame, guardando la trayectoria del piloto
+        juego.cambiar_estado('jugando', semilla=semilla)
+        simulacion = SimulacionSinVentana(juego, saltar_tiempo=False)
+        trayectoria = []
+        inicio = time.perf_counter()
+        while simulacion.frame < frames:
+            partida = simulacion.ejecutar(guion, simulacion.frame + 1)
+            if juego.estado_actual is not partida:
+                break
+            trayectoria.append(_estado_piloto(partida.personaje, partida.offset_x))
+        referencia = _estado_partida(partida)
+        duracion_referencia = time.perf_counter() - inicio
+        
+        juego.cambiar_estado('jugando', semilla=semilla)
+        simulacion = SimulacionSinVentana(juego, saltar_tiempo=True)
+        inicio = time.perf_counter()
+        partida = simulacion.ejecutar(guion, frames)
+        duracion = time.perf_counter() - inicio
+        if _estado_partida(partida) != referencia:
+            errores.append(f"semilla {semilla}: el salto de tiempo no coincide con la simulación frame a frame")
+        
+        # Un fantasma de la partida debe seguir exactamente la misma trayectoria
+        fantasmas = SistemaFantasmas(
+            [partida.grabador.repeticion()], juego.recursos.sprites, partida.suelo_y
+        )
+        for frame, esperado in enumerate(trayectoria):
+            fantasmas.actualizar()
+            if _estado_piloto(fantasmas.personajes[0], fantasmas.offsets[0]) != esperado:
+                errores.append(f"semilla {semilla}: el fantasma se separa de la partida en el frame {frame}")
+                break
+        
+        print(f"[verificar] semilla {semilla}: {len(trayectoria)} frames, "
+              f"{simulacion.frames_saltados} saltados, "
+              f"{duracion_referencia / max(duracion, 1e-9):.1f}x más rápido")
+    return errores
+
+
+# ==================== CAPTURA DE FOTOGRAMAS ====================
+_superficie_a_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+
+
+def codificar_png(datos, ancho, alto, nivel=3):
+    """Codifica un buffer RGB como PNG; zlib libera el GIL, así que escala con hilos"""
+    fila = ancho * 3
+    crudo = b"".join(b"\x00" + datos[y * fila:(y + 1) * fila] for y in range(alto))
+    
+    def bloque(tipo, contenido):
+        return (
+            struct.pack(">I", len(contenido)) + tipo + contenido
+            + struct.pack(">I", zlib.crc32(tipo + contenido) & 0xFFFFFFFF)
+        )
+    
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + bloque(b"IHDR", struct.pack(">IIBBBBB", ancho, alto, 8, 2, 0, 0, 0))
+        + bloque(b"IDAT", zlib.compress(crudo, nivel))
+        + bloque(b"IEND", b"")
+    )
+
+
+class CapturaFotogramas:
+    """Renderiza una partida sin ventana y guarda sus fotogramas en disco"""
+    
+    FORMATOS = ("png", "rgb")
+    
+    def __init__(self, juego, destino, formato="png", resolucion=None, fps=60, hilos=None):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        if not 1 <= fps <= FPS:
+            # Solo se pueden guardar fotogramas que la simulación produce
+            raise ValueError(f"fps debe estar entre 1 y {FPS}: {fps}")
+        self.juego = juego
+        self.destino = destino
+        self.formato = formato
+        self.resolucion = tuple(resolucion) if resolucion else juego.ventana.get_size()
+        self.fps = fps
+        self.hilos = hilos or os.cpu_count() or 2
+        self.fotogramas = 0
+        
+        # El archivo RGB se escribe en orden, así que usa un único hilo
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.hilos if formato == "png" else 1, thread_name_prefix="captura"
+        )
+        self._pendientes = deque()
+        self._archivo_rgb = None
+    
+    def capturar(self, guion, frames, semilla=None, torneo=False, cola=60):
+        """Juega `guion` desde el inicio de una partida y captura hasta `frames` frames"""
+        os.makedirs(self.destino, exist_ok=True)
+        self._borrar_captura_anterior()
+        if self.formato == "rgb":
+            self._archivo_rgb = open(os.path.join(self.destino, "captura.rgb"), "wb")
+        
+        juego = self.juego
+        juego.cambiar_estado('jugando', torneo=torneo, semilla=semilla)
+        partida = juego.estado_actual
+        
+        acumulado = 0.0
+        paso = self.fps / 60
+        frame = 0
+        restantes = None
+        try:
+            while frame < frames and restantes != 0:
+                if juego.estado_actual is partida:
+                    eventos = partida.entradas_guion(guion, frame)
+                else:
+                    eventos = []
+                    restantes = cola if restantes is None else restantes - 1
+                
+                juego.procesar_frame(eventos)
+                frame += 1
+                
+                acumulado += paso
+                if acumulado >= 1:
+                    acumulado -= 1
+                    self._encolar(juego.ventana)
+        finally:
+            self.cerrar()
+        
+        self._guardar_info()
+        return partida
+    
+    def _borrar_captura_anterior(self):
+        for nombre in os.listdir(self.destino):
+            fotograma = nombre.startswith("fotograma_") and nombre.endswith(".png")
+            if fotograma or nombre in ("captura.rgb", "info.json"):
+                os.remove(os.path.join(self.destino, nombre))
+    
+    def _encolar(self, ventana):
+        superficie = ventana
+        if superficie.get_size() != self.resolucion:
+            superficie = pygame.transform.smoothscale(ventana, self.resolucion)
+        datos = _superficie_a_bytes(superficie, "RGB")
+        
+        if self.formato == "png":
+            ruta = os.path.join(self.destino, f"fotograma_{self.fotogramas:06d}.png")
+            futuro = self._pool.submit(self._escribir_png, ruta, datos)
+        else:
+            futuro = self._pool.submit(self._archivo_rgb.write, datos)
+        self.fotogramas += 1
+        
+        # Limitar los fotogramas en memoria si el disco no da abasto
+        self._pendientes.append(futuro)
+        while len(self._pendientes) > self.hilos * 4:
+            self._pendientes.popleft().result()
+    
+    def _escribir_png(self, ruta, datos):
+        ancho, alto = self.resolucion
+        with open(ruta, "wb") as archivo:
+            archivo.write(codificar_png(datos, ancho, alto))
+    
+    def _guardar_info(self):
+        ancho, alto = self.resolucion
+        with open(os.path.join(self.destino, "info.json"), "w") as archivo:
+            json.dump({
+                "formato": self.formato, "ancho": ancho, "alto": alto,
+                "fps": self.fps, "fotogramas": self.fotogramas
+            }, archivo)
+    
+    def cerrar(self):
+        while self._pendientes:
+            self._pendientes.popleft().result()
+        self._pool.shutdown(wait=True)
+        if self._archivo_rgb is not None:
+            self._archivo_rgb.close()
+            self._archivo_rgb = None
+
+
+# ==================== CALIDAD ADAPTATIVA ====================
+# Niveles de calidad de menor a mayor coste
+NIVELES_CALIDAD = [
+    {'rotacion_suave': False, 'capas_parallax': 1, 'fantasmas': 3, 'escalado_suave': False, 'hud_cada': 15},
+    {'rotacion_suave': False, 'capas_parallax': 2, 'fantasmas': 10, 'escalado_suave': False, 'hud_cada': 6},
+    {'rotacion_suave': False, 'capas_parallax': 3, 'fantasmas': 25, 'escalado_suave': True, 'hud_cada': 2},
+    {'rotacion_suave': True, 'capas_parallax': 3, 'fantasmas': FANTASMAS_MAX, 'escalado_suave': True, 'hud_cada': 1},
+]
+
+
+class GobernadorCalidad:
+    """Sube o baja el nivel de calidad según un percentil móvil del tiempo de frame"""
+    
+    def __init__(self, fps_objetivo=60, percentil=0.95, muestras=120, cada=30,
+                 umbral_subir=0.6, enfriamiento=120, nivel=len(NIVELES_CALIDAD) - 1):
+        self.presupuesto_ms = 1000 / fps_objetivo
+        self.percentil = percentil
+        self.cada = cada
+        self.umbral_subir = umbral_subir
+        self.enfriamiento = enfriamiento
+        self.nivel = nivel
+        self.calidad = dict(NIVELES_CALIDAD[nivel])
+        
+        self._tiempos = deque(maxlen=muestras)
+        self._frame = 0
+        self._ultimo_cambio = -enfriamiento
+        self._subio = False
+        self._estables = 0
+        self._fallos = [0] * len(NIVELES_CALIDAD)
+    
+    def registrar(self, ms):
+        """Registra el tiempo de trabajo de un frame; devuelve True si cambió el nivel"""
+        self._tiempos.append(ms)
+        self._frame += 1
+        if self._frame % self.cada or len(self._tiempos) < self._tiempos.maxlen:
+            return False
+        if self._frame - self._ultimo_cambio < self.enfriamiento:
+            return False
+        
+        valor = self.valor_percentil()
+        if valor > self.presupuesto_ms and self.nivel > 0:
+            if self._subio:
+                self._fallos[self.nivel] = min(self._fallos[self.nivel] + 1, 8)
+            self._cambiar(self.nivel - 1, subio=False)
+            return True
+        
+        if valor < self.presupuesto_ms * self.umbral_subir and self.nivel < len(NIVELES_CALIDAD) - 1:
+            self._estables += 1
+            if self._estables >= 3 * 2 ** self._fallos[self.nivel + 1]:
+                self._cambiar(self.nivel + 1, subio=True)
+                return True
+        else:
+            self._estables = 0
+        return False
+    
+    def valor_percentil(self):
+        ordenados = sorted(self._tiempos)
+        return ordenados[min(len(ordenados) - 1, int(len(ordenados) * self.percentil))]
+    
+    def _cambiar(self, nivel, subio):
+        self.nivel = nivel
+        self._subio = subio
+        # Se actualiza en el sitio: los estados guardan una referencia a este dict
+        self.calidad.update(NIVELES_CALIDAD[nivel])
+        self._tiempos.clear()
+        self._estables = 0
+        self._ultimo_cambio = self._frame
+
+
+# ==================== MEMORIA ====================
+def bytes_superficie(superficie):
+    return superficie.get_pitch() * superficie.get_height()
+
+
+def bytes_superficies(contenedor):
+    """Suma los píxeles de todas las superficies de un dict/lista, recursivamente"""
+    if isinstance(contenedor, pygame.Surface):
+        return bytes_superficie(contenedor)
+    if isinstance(contenedor, dict):
+        contenedor = contenedor.values()
+    if isinstance(contenedor, (list, tuple, set, type({}.values()))):
+        return sum(bytes_superficies(elemento) for elemento in contenedor)
+    return 0
+
+
+def tamano_profundo(objeto):
+    """Memoria aproximada de un objeto y todo lo que referencia (sin superficies)"""
+    vistos = set()
+    pendientes = [objeto]
+    total = 0
+    while pendientes:
+        actual = pendientes.pop()
+        if id(actual) in vistos or isinstance(actual, (type, pygame.Surface)) or callable(actual):
+            continue
+        vistos.add(id(actual))
+        total += sys.getsizeof(actual)
+        if isinstance(actual, dict):
+            pendientes.extend(actual.keys())
+            pendientes.extend(actual.values())
+        elif isinstance(actual, (list, tuple, set, frozenset, deque)):
+            pendientes.extend(actual)
+        elif hasattr(actual, '__dict__'):
+            pendientes.append(actual.__dict__)
+    return total
+
+
+class MonitorMemoria:
+    """Mide periódicamente la memoria por subsistema y la compara por estado"""
+    
+    def __init__(self, juego, intervalo=3600, lineas=10, mostrar=True):
+        self.juego = juego
+        self.intervalo = intervalo
+        self.lineas = lineas
+        self.mostrar = mostrar
+        self.frame = 0
+        self.instantaneas = {}
+        self.diferencias = {}
+        self.historial = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    def actualizar(self):
+        self.frame += 1
+        if self.frame % self.intervalo == 0:
+            informe = self.muestrear()
+            if self.mostrar:
+                self.imprimir(informe)
+    
+    def superficies(self):
+        """Bytes de píxeles por caché de superficies (SDL los reserva fuera de tracemalloc)"""
+        recursos = self.juego.recursos
+        totales = {
+            'recursos.sprites': bytes_superficies(recursos.sprites),
+            'recursos.fondo': bytes_superficies([capa.superficie for capa in recursos.fondo.capas]),
+        }
+        jugando = self.juego.estados.get('jugando')
+        if jugando is not None:
+            totales['hud.cache'] = bytes_superficies([c[1] for c in jugando._cache_hud.values()])
+            totales['fantasmas.cache_rotacion'] = bytes_superficies(jugando.fantasmas._cache_rotacion)
+        return totales
+    
+    def subsistemas(self):
+        juego = self.juego
+        totales = self.superficies()
+        totales['telemetria.buffer'] = tamano_profundo(juego.telemetria)
+        totales['puntajes'] = (tamano_profundo(juego.gestor_puntajes.puntajes_altos)
+                               + tamano_profundo(juego.gestor_puntajes.repeticiones.indice))
+        
+        jugando = juego.estados.get('jugando')
+        if jugando is not None:
+            totales['rampas'] = tamano_profundo(jugando.gestor_rampas.rampas)
+            totales['grabador'] = tamano_profundo(jugando.grabador.cambios)
+            fantasmas = jugando.fantasmas
+            totales['fantasmas'] = tamano_profundo([
+                fantasmas.guiones, fantasmas.offsets, fantasmas.cursores
+            ]) + sum(tamano_profundo(g.rampas) for g in set(fantasmas.gestores_rampas))
+        return totales
+    
+    def estados_vivos(self):
+        conteo = {}
+        for estado in list(Estado.instancias):
+            nombre = type(estado).__name__
+            conteo[nombre] = conteo.get(nombre, 0) + 1
+        return conteo
+    
+    def muestrear(self):
+        nombre_estado = type(self.juego.estado_actual).__name__
+        instantanea = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        anterior = self.instantaneas.get(nombre_estado)
+        if anterior is not None:
+            self.diferencias[nombre_estado] = [
+                diferencia for diferencia in instantanea.compare_to(anterior, 'lineno')[:self.lineas]
+                if diferencia.size_diff > 0
+            ]
+        self.instantaneas[nombre_estado] = instantanea
+        
+        actual, pico = tracemalloc.get_traced_memory()
+        informe = {
+            'frame': self.frame,
+            'estado': nombre_estado,
+            'traced': actual,
+            'pico': pico,
+            'subsistemas': self.subsistemas(),
+            'estados_vivos': self.estados_vivos(),
+            'ritmo': self.juego.ritmo.estadisticas.resumen(),
+        }
+        self.historial.append((self.frame, actual))
+        return informe
+    
+    def imprimir(self, informe):
+        print(f"[memoria] frame {informe['frame']} ({informe['estado']}): "
+              f"{informe['traced'] / 1024:.0f} KiB en uso, pico {informe['pico'] / 1024:.0f} KiB")
+        for nombre, total in sorted(informe['subsistemas'].items(), key=lambda x: -x[1]):
+            print(f"  {nombre:<26} {total / 1024:10.1f} KiB")
+        print(f"  estados vivos: {informe['estados_vivos']}")
+        ritmo = informe['ritmo']
+        if ritmo['frames']:
+            print(f"  ritmo ({self.juego.ritmo.estrategia}): jitter {ritmo['jitter']:.2f} ms, "
+                  f"p99 {ritmo['p99']:.2f} ms, {ritmo['tardios']} frames tardíos")
+        for diferencia in self.diferencias.get(informe['estado'], []):
+            print(f"  + {diferencia}")
+
+
+class PruebaResistencia:
+    """Juega sin ventana durante horas con un bot y vigila el crecimiento de memoria"""
+    
+    def __init__(self, juego, duracion_s, umbral_bytes, intervalo=36000, semilla=0):
+        self.juego = juego
+        self.duracion_s = duracion_s
+        self.umbral_bytes = umbral_bytes
+        self.monitor = MonitorMemoria(juego, intervalo=intervalo)
+        self.rng = random.Random(semilla)
+        self.partidas = 0
+    
+    def memoria(self):
+        """Bytes trazados por tracemalloc más los píxeles de las superficies en caché"""
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] + sum(self.monitor.superficies().values())
+    
+    def ejecutar(self):
+        juego = self.juego
+        inicio = time.monotonic()
+        calentamiento = inicio + min(120, self.duracion_s * 0.1)
+        base = None
+        
+        while time.monotonic() - inicio < self.duracion_s:
+            self.partidas += 1
+            if self.partidas % 10 == 0:
+                juego.cambiar_estado('puntajes')
+                for _ in range(60):
+                    juego.procesar_frame([])
+            
+            juego.cambiar_estado('jugando', torneo=self.partidas % 2 == 0)
+            partida = juego.estado_actual
+            guion = guion_bot(self.rng, 30000)
+            frame = 0
+            while juego.estado_actual is partida and frame < 30000:
+                juego.procesar_frame(partida.entradas_guion(guion, frame))
+                self.monitor.actualizar()
+                frame += 1
+            
+            if base is None and time.monotonic() >= calentamiento:
+                base = self.memoria()
+        
+        final = self.memoria()
+        base = final if base is None else base
+        crecimiento = final - base
+        informe = self.monitor.muestrear()
+        self.monitor.imprimir(informe)
+        print(f"[resistencia] {self.partidas} partidas, {self.monitor.frame} frames, "
+              f"crecimiento {crecimiento / 1024:.0f} KiB (umbral {self.umbral_bytes / 1024:.0f} KiB)")
+        return crecimiento <= self.umbral_bytes
+
+
+# ==================== RITMO DE FRAMES ====================
+class EstadisticasRitmo:
+    """Intervalos entre frames: media, jitter (desviación típica), percentiles y frames tardíos"""
+    
+    def __init__(self, periodo_ms, muestras=600):
+        self.periodo_ms = periodo_ms
+        self._intervalos = deque(maxlen=muestras)
+        self.reiniciar()
+    
+    def reiniciar(self):
+        self._intervalos.clear()
+        self.frames = 0
+        self.tardios = 0
+        self.maximo = 0.0
+    
+    def registrar(self, ms):
+        self._intervalos.append(ms)
+        self.frames += 1
+        # Un intervalo de más de periodo y medio es un frame que se ha repetido en pantalla
+        if ms > self.periodo_ms * 1.5:
+            self.tardios += 1
+        self.maximo = max(self.maximo, ms)
+    
+    def resumen(self):
+        """Estadísticas de los últimos intervalos; frames, tardíos y máximo son acumulados"""
+        intervalos = sorted(self._intervalos)
+        n = len(intervalos)
+        if not n:
+            return {'frames': 0, 'media': 0.0, 'jitter': 0.0, 'desvio': 0.0, 'p50': 0.0,
+                    'p99': 0.0, 'maximo': 0.0, 'tardios': 0}
+        media = sum(intervalos) / n
+        return {
+            'frames': self.frames,
+            'media': media,
+            'jitter': math.sqrt(sum((x - media) ** 2 for x in intervalos) / n),
+            'desvio': sum(abs(x - self.periodo_ms) for x in intervalos) / n,
+            'p50': intervalos[n // 2],
+            'p99': intervalos[min(n - 1, int(n * 0.99))],
+            'maximo': self.maximo,
+            'tardios': self.tardios,
+        }
+
+
+class RitmoFrames:
+    """Espera entre frames con distintas estrategias y mide el jitter resultante"""
+    
+    ESTRATEGIAS = ("reloj", "busy", "hibrido", "vsync")
+    
+    def __init__(self, fps=FPS, estrategia=RITMO_ESTRATEGIA, margen_ms=RITMO_MARGEN_MS,
+                 informe_cada=RITMO_INFORME):
+        self.fps = fps
+        self.periodo = 1 / fps
+        self.margen = margen_ms / 1000
+        self.informe_cada = informe_cada
+        self.reloj = pygame.time.Clock()
+        self.estadisticas = EstadisticasRitmo(self.periodo * 1000)
+        self.vsync_marca_ritmo = False
+        self.espera_flip_ms = 0.0
+        self.cambiar(estrategia)
+    
+    def cambiar(self, estrategia):
+        if estrategia not in self.ESTRATEGIAS:
+            raise ValueError(f"Estrategia de ritmo desconocida: {estrategia}")
+        self.estrategia = estrategia
+        self.espera_flip_ms = 0.0
+        self.estadisticas.reiniciar()
+        self._siguiente = None
+        self._anterior = None
+    
+    def calibrar_vsync(self, frames=12):
+        """Comprueba que flip() espera al refresco y que este coincide con los fps"""
+        pygame.display.flip()
+        anterior = time.perf_counter()
+        intervalos = []
+        for _ in range(frames):
+            pygame.display.flip()
+            ahora = time.perf_counter()
+            intervalos.append(ahora - anterior)
+            anterior = ahora
+        mediana = max(sorted(intervalos)[frames // 2], 1e-6)
+        self.vsync_marca_ritmo = abs(mediana - self.periodo) < self.periodo * 0.1
+        if not self.vsync_marca_ritmo:
+            print(f"El refresco ({1 / mediana:.0f} Hz) no coincide con {self.fps} fps; "
+                  f"se completa con espera híbrida")
+    
+    def presentar(self):
+        """Hace el flip; con vsync apunta cuánto ha estado bloqueado esperando al refresco"""
+        if self.estrategia != "vsync":
+            self.espera_flip_ms = 0.0
+            pygame.display.flip()
+            return
+        inicio = time.perf_counter()
+        pygame.display.flip()
+        self.espera_flip_ms = (time.perf_counter() - inicio) * 1000
+    
+    def esperar(self):
+        if self.estrategia == "reloj":
+            self.reloj.tick(self.fps)
+        elif self.estrategia == "busy":
+            self.reloj.tick_busy_loop(self.fps)
+        elif self.estrategia == "hibrido" or not self.vsync_marca_ritmo:
+            self._esperar_hibrido()
+        
+        ahora = time.perf_counter()
+        if self._anterior is not None:
+            self.estadisticas.registrar((ahora - self._anterior) * 1000)
+            if self.informe_cada and self.estadisticas.frames % self.informe_cada == 0:
+                self.imprimir()
+        self._anterior = ahora
+    
+    def _esperar_hibrido(self):
+        if self._siguiente is None:
+            self._siguiente = time.perf_counter() + self.periodo
+        objetivo = self._siguiente
+        restante = objetivo - time.perf_counter()
+        if restante > self.margen:
+            time.sleep(restante - self.margen)
+        while time.perf_counter() < objetivo:
+            time.sleep(0)
+        
+        # Si el frame se ha pasado más de un periodo no se intenta recuperar el retraso
+        ahora = time.perf_counter()
+        if ahora - objetivo > self.periodo:
+            self._siguiente = ahora + self.periodo
+        else:
+            self._siguiente = objetivo + self.periodo
+    
+    def imprimir(self, resumen=None):
+        r = resumen or self.estadisticas.resumen()
+        print(f"[ritmo] {self.estrategia}: {r['media']:.2f} ms de media, "
+              f"jitter {r['jitter']:.2f} ms, p99 {r['p99']:.2f} ms, "
+              f"máx. {r['maximo']:.2f} ms, {r['tardios']}/{r['frames']} frames tardíos")
+
+
 # ==================== JUEGO PRINCIPAL ====================
 class Juego:
     """Clase principal que gestiona el juego"""
     
-    def __init__(self):
-        self.ventana = pygame.display.set_mode((ANCHO, ALTO))
+    def __init__(self, sin_ventana=False):
+        if sin_ventana:
+            # Los controladores "dummy" de SDL no abren ventana ni dispositivo de audio
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        self.sin_ventana = sin_ventana
+        
+        # Los estados dibujan siempre en una superficie de ANCHO x ALTO; si la
+        # pantalla tiene otra resolución se escala al presentar
+        self.resolucion = RESOLUCION_PANTALLA if RESOLUCION_PANTALLA and not sin_ventana else (ANCHO, ALTO)
+        self.ritmo = RitmoFrames(estrategia="reloj" if sin_ventana else RITMO_ESTRATEGIA)
+        self._abrir_pantalla()
         pygame.display.set_caption("Stunt Bike Extreme")
         
         self.recursos = GestorRecursos()
-        self.gestor_puntajes = GestorPuntajes()
-        self.reloj = pygame.time.Clock()
+        # Las partidas sin ventana (bots, capturas) no tocan puntajes ni telemetría
+        self.gestor_puntajes = GestorPuntajes(
+            None if sin_ventana else SERVIDOR_PUNTAJES, solo_lectura=sin_ventana
+        )
+        self.gobernador = GobernadorCalidad(FPS)
+        self.calidad = self.gobernador.calidad
+        self.monitor_memoria = None
+        
+        # Guardado periódico de la partida en curso (no en partidas sin ventana)
+        self.persistidor = None
+        if not sin_ventana:
+            self.persistidor = PersistidorPartida()
+            self.persistidor.start()
+        
+        # Telemetría en segundo plano
+        self.telemetria = BusTelemetria(activo=TELEMETRIA_ACTIVA and not sin_ventana)
+        self.escritor_telemetria = EscritorTelemetria(self.telemetria)
+        if self.telemetria.activo:
+            self.escritor_telemetria.start()
+            atexit.register(self.escritor_telemetria.detener)
         
         # Iniciar música
         self.recursos.iniciar_musica()
@@ -871,11 +2983,50 @@ class Juego:
         }
         
         self.estado_actual = self.estados['menu']
+        
+        if MEMORIA_INSTRUMENTADA:
+            self.monitor_memoria = MonitorMemoria(self)
+    
+    def _abrir_pantalla(self):
+        self.pantalla = None
+        if self.ritmo.estrategia == "vsync":
+            # SDL solo sincroniza el flip con el refresco si la ventana usa su renderizador
+            try:
+                self.pantalla = pygame.display.set_mode(self.resolucion, pygame.SCALED, vsync=1)
+                self.ritmo.calibrar_vsync()
+            except pygame.error as e:
+                print(f"VSync no disponible ({e}); se usa el ritmo híbrido")
+                self.ritmo.cambiar("hibrido")
+        if self.pantalla is None:
+            self.pantalla = pygame.display.set_mode(self.resolucion)
+        
+        if self.pantalla.get_size() == (ANCHO, ALTO):
+            self.ventana = self.pantalla
+        else:
+            self.ventana = pygame.Surface((ANCHO, ALTO)).convert()
+    
+    def configurar_ritmo(self, estrategia):
+        """Cambia la estrategia de ritmo; reabre la pantalla si se activa o desactiva vsync"""
+        vsync_antes = self.ritmo.estrategia == "vsync"
+        self.ritmo.cambiar(estrategia)
+        if (estrategia == "vsync") != vsync_antes:
+            self._abrir_pantalla()
     
     def cambiar_estado(self, nombre_estado, **kwargs):
         if nombre_estado == 'jugando':
-            self.estados['jugando'] = EstadoJugando(self)
-            self.estados['jugando'].reiniciar()
+            reanudar = kwargs.get('reanudar')
+            if reanudar is not None and reanudar.get('telemetria'):
+                self.telemetria.nueva_partida(reanudar['telemetria'] + [reanudar['frame']])
+            else:
+                self.telemetria.nueva_partida()
+            self.estados['menu'].olvidar_partida_guardada()
+            if reanudar is not None:
+                self.estados['jugando'] = EstadoJugando.reanudada(self, reanudar)
+            else:
+                # El constructor ya llama a reiniciar()
+                self.estados['jugando'] = EstadoJugando(
+                    self, kwargs.get('torneo', False), kwargs.get('semilla')
+                )
             self.estado_actual = self.estados['jugando']
         elif nombre_estado == 'game_over':
             puntos = kwargs.get('puntos_finales', 0)
@@ -884,30 +3035,181 @@ class Juego:
         else:
             self.estado_actual = self.estados[nombre_estado]
     
+    def procesar_frame(self, eventos):
+        # Manejar eventos del estado actual
+        self.estado_actual.manejar_eventos(eventos)
+        
+        # Actualizar estado actual
+        self.estado_actual.actualizar()
+        
+        # Dibujar estado actual
+        self.estado_actual.dibujar(self.ventana)
+    
     def ejecutar(self):
         while True:
             # Capturar eventos
             eventos = pygame.event.get()
             for evento in eventos:
                 if evento.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-            
-            # Manejar eventos del estado actual
-            self.estado_actual.manejar_eventos(eventos)
-            
-            # Actualizar estado actual
-            self.estado_actual.actualizar()
-            
-            # Dibujar estado actual
-            self.estado_actual.dibujar(self.ventana)
+                    self.salir()
             
-            # Actualizar pantalla
-            pygame.display.flip()
-            self.reloj.tick(60)
+            self.ciclo(eventos)
+    
+    def salir(self):
+        if isinstance(self.estado_actual, EstadoJugando):
+            self.estado_actual.abandonar()
+        if self.persistidor is not None:
+            self.persistidor.esperar()
+        pygame.quit()
+        sys.exit()
+    
+    def ciclo(self, eventos):
+        inicio = time.perf_counter()
+        self.procesar_frame(eventos)
+        
+        # Actualizar pantalla
+        self.presentar()
+        if CALIDAD_ADAPTATIVA:
+            # El tiempo bloqueado en el flip por vsync no es trabajo del frame
+            trabajo = (time.perf_counter() - inicio) * 1000 - self.ritmo.espera_flip_ms
+            self.gobernador.registrar(trabajo)
+        if self.monitor_memoria is not None:
+            self.monitor_memoria.actualizar()
+        self.ritmo.esperar()
+    
+    def presentar(self):
+        if self.ventana is not self.pantalla:
+            if self.calidad['escalado_suave']:
+                pygame.transform.smoothscale(self.ventana, self.pantalla.get_size(), self.pantalla)
+            else:
+                pygame.transform.scale(self.ventana, self.pantalla.get_size(), self.pantalla)
+        self.ritmo.presentar()
 
 
 # ==================== PUNTO DE ENTRADA ====================
-if __name__ == "__main__":
+def _fps_captura(texto):
+    fps = int(texto)
+    if not 1 <= fps <= FPS:
+        raise argparse.ArgumentTypeError(f"debe estar entre 1 y {FPS}")
+    return fps
+
+
+def _resolucion(texto):
+    try:
+        ancho, alto = (int(v) for v in texto.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("debe tener la forma ANCHOxALTO, p. ej. 1280x720")
+    if ancho <= 0 or alto <= 0:
+        raise argparse.ArgumentTypeError("el ancho y el alto deben ser positivos")
+    return ancho, alto
+
+
+def _leer_argumentos():
+    parser = argparse.ArgumentParser(description="Stunt Bike Extreme")
+    parser.add_argument("--capturar", metavar="REPETICION",
+                        help="id de una repetición guardada o ruta a su JSON; se renderiza sin ventana")
+    parser.add_argument("--salida", default="captura", help="directorio de los fotogramas")
+    parser.add_argument("--formato", choices=CapturaFotogramas.FORMATOS, default="png")
+    parser.add_argument("--resolucion", type=_resolucion, default=(ANCHO, ALTO), metavar="ANCHOxALTO",
+                        help="p. ej. 1280x720")
+    parser.add_argument("--fps", type=_fps_captura, default=FPS, metavar=f"1-{FPS}",
+                        help="fotogramas por segundo de la captura")
+    parser.add_argument("--resistencia", type=float, metavar="HORAS",
+                        help="prueba de resistencia sin ventana durante HORAS vigilando la memoria")
+    parser.add_argument("--umbral-mb", type=float, default=20,
+                        help="crecimiento de memoria máximo permitido en la prueba de resistencia")
+    parser.add_argument("--verificar-simulacion", type=int, metavar="SEMILLAS",
+                        help="comprueba con SEMILLAS bots que el salto de tiempo y los fantasmas "
+                             "reproducen la simulación frame a frame")
+    parser.add_argument("--ritmo", choices=RitmoFrames.ESTRATEGIAS,
+                        help=f"estrategia de espera entre frames (por defecto {RITMO_ESTRATEGIA})")
+    parser.add_argument("--medir-ritmo", type=float, metavar="SEGUNDOS",
+                        help="juega SEGUNDOS con cada estrategia de ritmo y compara su jitter")
+    return parser.parse_args()
+
+
+def _capturar_repeticion(args):
+    juego = Juego(sin_ventana=True)
+    if os.path.exists(args.capturar):
+        with open(args.capturar, "r") as file:
+            repeticion = json.load(file)
+    else:
+        repeticion = juego.gestor_puntajes.repeticiones.cargar(args.capturar)
+    if repeticion is None:
+        print(f"No se encontró la repetición {args.capturar}")
+        sys.exit(1)
+    
+    captura = CapturaFotogramas(juego, args.salida, args.formato, args.resolucion, args.fps)
+    inicio = time.perf_counter()
+    partida = captura.capturar(
+        GuionEntradas.desde_repeticion(repeticion), repeticion["frames"] + 60,
+        semilla=repeticion["semilla"]
+    )
+    duracion = time.perf_counter() - inicio
+    print(f"{captura.fotogramas} fotogramas en {duracion:.1f} s "
+          f"({captura.fotogramas / args.fps / max(duracion, 1e-9):.1f}x tiempo real); "
+          f"puntaje final: {partida.puntos}")
+
+
+def _prueba_resistencia(args):
+    juego = Juego(sin_ventana=True)
+    prueba = PruebaResistencia(juego, args.resistencia * 3600, args.umbral_mb * 1024 * 1024)
+    sys.exit(0 if prueba.ejecutar() else 1)
+
+
+def _verificar_simulacion(args):
+    errores = verificar_simulacion(Juego(sin_ventana=True), range(args.verificar_simulacion))
+    for error in errores:
+        print(error)
+    sys.exit(1 if errores else 0)
+
+
+def _medir_ritmo(args):
+    """Juega con un bot en pantalla con cada estrategia y muestra una tabla de jitter"""
     juego = Juego()
-    juego.ejecutar()
\ No newline at end of file
+    # El bot no deja puntajes, telemetría ni partidas guardadas
+    juego.gestor_puntajes.solo_lectura = True
+    juego.telemetria.activo = False
+    juego.persistidor = None
+    guion = GuionEntradas([(0, {pygame.K_RIGHT})] + [
+        (frame, {pygame.K_RIGHT, pygame.K_SPACE} if frame % 90 == 0 else {pygame.K_RIGHT})
+        for frame in range(60, 60 * 3600, 15)
+    ])
+    resultados = {}
+    for estrategia in RitmoFrames.ESTRATEGIAS:
+        juego.configurar_ritmo(estrategia)
+        if juego.ritmo.estrategia != estrategia:
+            continue  # vsync no disponible: ya se ha medido la alternativa
+        juego.cambiar_estado('jugando', semilla=0)
+        frame = 0
+        fin = time.perf_counter() + args.medir_ritmo
+        while time.perf_counter() < fin:
+            pygame.event.pump()
+            if juego.estado_actual is not juego.estados['jugando']:
+                juego.cambiar_estado('jugando', semilla=0)
+                frame = 0
+            juego.ciclo(juego.estado_actual.entradas_guion(guion, frame))
+            frame += 1
+        resultados[estrategia] = juego.ritmo.estadisticas.resumen()
+    
+    print(f"{'estrategia':<10} {'media':>8} {'jitter':>8} {'desvío':>8} {'p99':>8} {'máx.':>8} {'tardíos':>8}")
+    for estrategia, r in resultados.items():
+        print(f"{estrategia:<10} {r['media']:8.2f} {r['jitter']:8.2f} {r['desvio']:8.2f} "
+              f"{r['p99']:8.2f} {r['maximo']:8.2f} {r['tardios']:8d}")
+
+
+if __name__ == "__main__":
+    argumentos = _leer_argumentos()
+    if argumentos.ritmo:
+        RITMO_ESTRATEGIA = argumentos.ritmo
+    if argumentos.capturar:
+        _capturar_repeticion(argumentos)
+    elif argumentos.resistencia:
+        _prueba_resistencia(argumentos)
+    elif argumentos.verificar_simulacion:
+        _verificar_simulacion(argumentos)
+    elif argumentos.medir_ritmo:
+        _medir_ritmo(argumentos)
+    else:
+        juego = Juego()
+        juego.ejecutar()
@@ -0,0 +1,150 @@
+"""Servidor de puntajes compartido para Stunt Bike Extreme.
+
+Protocolo: una petición JSON por línea sobre TCP y una respuesta JSON por
+línea. Las conexiones son persistentes, así que un cliente puede enviar
+varias peticiones por la misma conexión.
+
+    {"op": "enviar", "puntajes": [{"id": "...", "puntos": 120, "fecha": "..."}]}
+    {"op": "top", "k": 10}
+
+Uso:
+
+    python servidor_puntajes.py --host 0.0.0.0 --puerto 8765
+"""
+import argparse
+import asyncio
+import json
+import os
+
+PUERTO = 8765
+ARCHIVO_MARCADOR = "data/marcador.json"
+MAX_LOTE = 100
+
+
+class ServidorPuntajes:
+    """Mantiene los mejores puntajes recibidos de todas las cabinas"""
+
+    def __init__(self, archivo=None, capacidad=100):
+        self.archivo = archivo
+        self.capacidad = capacidad
+        self.puntajes = self._cargar()
+        self._ids = {p.get("id") for p in self.puntajes}
+        self._servidor = None
+
+    def _cargar(self):
+        try:
+            if self.archivo and os.path.exists(self.archivo):
+                with open(self.archivo, "r") as file:
+                    return json.load(file)
+        except Exception as e:
+            print(f"No se pudo leer el marcador: {e}")
+        return []
+
+    def _guardar(self):
+        if not self.archivo:
+            return
+        try:
+            directorio = os.path.dirname(self.archivo)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = self.archivo + ".tmp"
+            with open(temporal, "w") as file:
+                json.dump(self.puntajes, file)
+            os.replace(temporal, self.archivo)
+        except Exception as e:
+            print(f"No se pudo guardar el marcador: {e}")
+
+    async def iniciar(self, host="127.0.0.1", puerto=PUERTO):
+        """Empieza a escuchar; con puerto 0 el sistema elige uno libre"""
+        self._servidor = await asyncio.start_server(self._atender, host, puerto)
+        return self._servidor.sockets[0].getsockname()[1]
+
+    async def detener(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                respuesta = self.procesar(linea)
+                writer.write(json.dumps(respuesta, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def procesar(self, linea):
+        try:
+            peticion = json.loads(linea)
+        except ValueError:
+            return {"ok": False, "error": "JSON inválido"}
+        if not isinstance(peticion, dict):
+            return {"ok": False, "error": "La petición debe ser un objeto JSON"}
+
+        op = peticion.get("op")
+        if op == "enviar":
+            puntajes = peticion.get("puntajes", [])
+            if not isinstance(puntajes, list):
+                return {"ok": False, "error": "puntajes debe ser una lista"}
+            return {"ok": True, "aceptados": self.agregar(puntajes)}
+        if op == "top":
+            k = peticion.get("k", 10)
+            if not isinstance(k, int) or isinstance(k, bool):
+                return {"ok": False, "error": "k debe ser un entero"}
+            k = max(0, min(k, self.capacidad))
+            return {"ok": True, "puntajes": self.puntajes[:k]}
+        return {"ok": False, "error": f"Operación desconocida: {op}"}
+
+    def agregar(self, puntajes):
+        aceptados = 0
+        for puntaje in puntajes[:MAX_LOTE]:
+            if not isinstance(puntaje, dict) or not isinstance(puntaje.get("puntos"), int):
+                continue
+            # Las cabinas dibujan la fecha tal cual: tiene que ser texto
+            if not isinstance(puntaje.get("fecha"), str):
+                continue
+            if puntaje.get("id") is not None and not isinstance(puntaje["id"], str):
+                continue
+            # Los reintentos del cliente repiten el id; no se cuentan dos veces
+            if puntaje.get("id") is not None and puntaje["id"] in self._ids:
+                aceptados += 1
+                continue
+            self.puntajes.append(puntaje)
+            self._ids.add(puntaje.get("id"))
+            aceptados += 1
+
+        if aceptados:
+            self.puntajes.sort(key=lambda x: x["puntos"], reverse=True)
+            del self.puntajes[self.capacidad:]
+            self._ids = {p.get("id") for p in self.puntajes}
+            self._guardar()
+        return aceptados
+
+
+async def _ejecutar(host, puerto, archivo):
+    servidor = ServidorPuntajes(archivo)
+    puerto = await servidor.iniciar(host, puerto)
+    print(f"Servidor de puntajes escuchando en {host}:{puerto}")
+    await servidor._servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de puntajes de Stunt Bike Extreme")
+    parser.add_argument("--host", default="127.0.0.1", help="usa 0.0.0.0 para la red local")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--archivo", default=ARCHIVO_MARCADOR)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_ejecutar(args.host, args.puerto, args.archivo))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()